@@ -1,3 +1,7 @@
+import asyncio
+import threading
+
+
 class AsyncGenerator(object):
     def __init__(self, items, process_func):
         self.items = items
@@ -26,3 +30,66 @@ class AsyncGenerator(object):
     def to_generator(items):
         for i in items:
             yield i
+
+
+class BackgroundReader(object):
+    def __init__(self, iter_func, batch_size, queue_size=2):
+        """
+        iterate a blocking iterator in a background thread, so that the event loop won't block on disk read
+
+        :param iter_func: function return an iterator, called in background thread,
+                          it should open its own file object, not share with the event loop thread
+        :param batch_size: how many items per batch
+        :param queue_size: at most queue_size batches buffered before the consumer get them
+        """
+        self.iter_func = iter_func
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.queue = self.loop = self.thread = None
+        self.stopped = False
+
+    async def get(self):
+        """
+        :return: a list of items, or None if no more items
+        """
+        if self.thread is None:
+            self.loop = asyncio.get_event_loop()
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        batch = await self.queue.get()
+        if isinstance(batch, Exception):
+            raise batch
+        return batch
+
+    def put(self, batch):
+        if not self.stopped:
+            # block the background thread until there's space in queue
+            asyncio.run_coroutine_threadsafe(self.queue.put(batch), self.loop).result()
+
+    def run(self):
+        items = self.iter_func()
+        try:
+            batch = list()
+            for item in items:
+                if self.stopped:
+                    return
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self.put(batch)
+                    batch = list()
+            if batch:
+                self.put(batch)
+            self.put(None)
+        except Exception as e:
+            self.put(e)
+        finally:
+            if hasattr(items, "close"):
+                items.close()
+
+    def close(self):
+        self.stopped = True
+        if self.queue is not None:
+            # unblock the background thread waiting for space in queue
+            while not self.queue.empty():
+                self.queue.get_nowait()
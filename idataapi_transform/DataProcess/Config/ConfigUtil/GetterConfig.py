@@ -1,7 +1,9 @@
+import os
+import copy
 import json
+import socket
 import asyncio
 import inspect
-import aioredis
 
 try:
     import aiomysql
@@ -13,11 +15,19 @@ try:
 except Exception as e:
     pass
 
+try:
+    import pyarrow
+except Exception as e:
+    pass
+
 from .BaseConfig import BaseGetterConfig
 
 from ..ESConfig import get_es_client
+from ..RedisConfig import get_redis_pool, RedisCodec, shard_keys
 from ..DefaultValue import DefaultVal
 from ..ConnectorConfig import session_manger
+from ..FileConfig import get_compression
+from ..LineOffsetIndex import LineOffsetIndex
 
 
 class RAPIConfig(BaseGetterConfig):
@@ -105,7 +115,8 @@ class RAPIConfig(BaseGetterConfig):
 
 class RCSVConfig(BaseGetterConfig):
     def __init__(self, filename, mode=DefaultVal.default_file_mode_r, encoding=DefaultVal.default_encoding,
-                 per_limit=None, max_limit=None, filter_=None, **kwargs):
+                 per_limit=None, max_limit=None, filter_=None, workers=None, chunk_size=DefaultVal.csv_chunk_size,
+                 ordered=True, read_in_thread=True, compression=None, **kwargs):
         """
         :param filename: filename to read
         :param mode: file open mode, i.e "r"
@@ -113,6 +124,14 @@ class RCSVConfig(BaseGetterConfig):
         :param per_limit: how many items to get per time
         :param max_limit: get at most max_limit items, if not set, get all
         :param filter_: run "transform --help" to see command line interface explanation for detail
+        :param workers: if greater than 1, split file into chunks and parse them in "workers" processes,
+                        only work for ascii compatible encoding, i.e "utf8", "gbk"
+        :param chunk_size: bytes per chunk when workers greater than 1
+        :param ordered: when workers greater than 1, whether return items in the same order as in file
+        :param read_in_thread: when used as async generator, read file in a background thread, so that
+                               the event loop won't block on disk read
+        :param compression: "gzip", "zstd", "lz4" or "none", if not set, detect by suffix of filename, i.e ".gz"
+                            workers is ignored for compressed file
         :param kwargs:
 
         Example:
@@ -137,6 +156,11 @@ class RCSVConfig(BaseGetterConfig):
         self.per_limit = per_limit
         self.max_limit = max_limit
         self.filter = filter_
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.ordered = ordered
+        self.read_in_thread = read_in_thread
+        self.compression = compression
 
 
 class RESConfig(BaseGetterConfig):
@@ -212,7 +236,9 @@ class RESConfig(BaseGetterConfig):
 
 class RJsonConfig(BaseGetterConfig):
     def __init__(self, filename, mode=DefaultVal.default_file_mode_r, encoding=DefaultVal.default_encoding,
-                 per_limit=None, max_limit=None, filter_=None, **kwargs):
+                 per_limit=None, max_limit=None, filter_=None, read_in_thread=True, use_index=False,
+                 index_filename=None, start_line=None, end_line=None, start_offset=None, use_mmap=False,
+                 compression=None, **kwargs):
         """
         :param filename: line by line json file to read
         :param mode: file open mode, i.e "r"
@@ -220,6 +246,18 @@ class RJsonConfig(BaseGetterConfig):
         :param per_limit: how many items to get per time
         :param max_limit: get at most max_limit items, if not set, get all
         :param filter_: run "transform --help" to see command line interface explanation for detail
+        :param read_in_thread: when used as async generator, read file in a background thread, so that
+                               the event loop won't block on disk read
+        :param use_index: whether use a sidecar line offset index(built once if not exists) to seek to start_line,
+                          automatically enabled if start_line or end_line set
+        :param index_filename: sidecar index file, default filename + ".idx"
+        :param start_line: read from start_line(0 means first line), i.e the checkpoint of a failed getter
+        :param end_line: read until end_line(exclude)
+        :param start_offset: read from byte offset start_offset, must be the start of a line, ignore start_line
+        :param use_mmap: memory map the file and split lines on bytes, bytes are passed to json.loads directly
+                         without decoding if encoding is utf8
+        :param compression: "gzip", "zstd", "lz4" or "none", if not set, detect by suffix of filename, i.e ".gz"
+                            use_index, start_offset and use_mmap not work for compressed file
         :param kwargs:
 
         Example:
@@ -231,6 +269,12 @@ class RJsonConfig(BaseGetterConfig):
             # both async generator and generator implemented
             for items in json_getter:
                 print(items)
+
+            # resume, json_getter.checkpoint() returns the line to resume from
+            json_config = RJsonConfig("./result.json", start_line=10000000)
+
+            # 4 getters read different parts of the file in parallel
+            json_getters = [ProcessFactory.create_getter(i) for i in json_config.split(4)]
         """
         super().__init__()
 
@@ -245,16 +289,53 @@ class RJsonConfig(BaseGetterConfig):
         self.per_limit = per_limit
         self.max_limit = max_limit
         self.filter = filter_
+        self.read_in_thread = read_in_thread
+        self.use_index = use_index or bool(start_line) or end_line is not None
+        self.index_filename = index_filename
+        self.start_line = start_line
+        self.end_line = end_line
+        self.start_offset = start_offset
+        self.use_mmap = use_mmap
+        self.compression = compression
+
+        if get_compression(filename, compression) and (self.use_index or start_offset or use_mmap):
+            raise ValueError("use_index, start_line, end_line, start_offset and use_mmap "
+                             "not work for compressed file: %s" % (filename, ))
+
+    def split(self, n):
+        """
+        split line range of this config into n parts by line offset index
+        :return: list of RJsonConfig, each one read a part of the file
+        """
+        index = LineOffsetIndex(self.filename, self.index_filename)
+        start_line = index.line_of(self.start_offset) if self.start_offset else (self.start_line or 0)
+        configs = list()
+        for start, end in index.split(n, start_line, self.end_line):
+            config = copy.copy(self)
+            config.use_index = True
+            config.start_line = start
+            config.end_line = end
+            config.start_offset = None
+            configs.append(config)
+        index.close()
+        return configs
 
 
 class RXLSXConfig(BaseGetterConfig):
-    def __init__(self, filename, per_limit=None, max_limit=None, sheet_index=0, filter_=None, **kwargs):
+    def __init__(self, filename, per_limit=None, max_limit=None, sheet_index=0, filter_=None, all_sheets=False,
+                 workers=None, ordered=True, sheet_key=None, **kwargs):
         """
         :param filename: filename to read
         :param per_limit: how many items to get per time
         :param max_limit: get at most max_limit items, if not set, get all
         :param sheet_index: which sheet to get, 0 means 0th sheet
         :param filter_: run "transform --help" to see command line interface explanation for detail
+        :param all_sheets: read all sheets one by one, first row of each sheet is its headers, ignore sheet_index
+        :param workers: only work with all_sheets, number of worker processes to read sheets in parallel,
+                        each worker loads a whole sheet in memory, None or 1 means read in current process
+        :param ordered: only work with workers, if False, items of a sheet are returned as soon as the sheet
+                        is read, instead of in sheet order
+        :param sheet_key: if set, add sheet title to each item with this key
         :param kwargs:
 
         Example:
@@ -280,6 +361,47 @@ class RXLSXConfig(BaseGetterConfig):
         self.max_limit = max_limit
         self.sheet_index = sheet_index
         self.filter = filter_
+        self.all_sheets = all_sheets
+        self.workers = workers
+        self.ordered = ordered
+        self.sheet_key = sheet_key
+
+
+class RParquetConfig(BaseGetterConfig):
+    def __init__(self, filename, per_limit=None, max_limit=None, filter_=None, columns=None, **kwargs):
+        """
+        :param filename: filename to read
+        :param per_limit: how many items to get per time
+        :param max_limit: get at most max_limit items, if not set, get all
+        :param filter_: run "transform --help" to see command line interface explanation for detail
+        :param columns: list of column names to read, if not set, read all columns
+        :param kwargs:
+
+        Example:
+            parquet_config = RParquetConfig("./result.parquet")
+            parquet_getter = ProcessFactory.create_getter(parquet_config)
+            async for items in parquet_getter:
+                print(items)
+
+            # both async generator and generator implemented
+            for items in parquet_getter:
+                print(items)
+
+        """
+        super().__init__()
+        if "pyarrow" not in globals():
+            raise ValueError("module parquet disabled, please install package pyarrow to enable it")
+
+        if not per_limit:
+            per_limit = DefaultVal.per_limit
+        if not max_limit:
+            max_limit = DefaultVal.max_limit
+
+        self.filename = filename
+        self.per_limit = per_limit
+        self.max_limit = max_limit
+        self.filter = filter_
+        self.columns = columns
 
 
 class RAPIBulkConfig(BaseGetterConfig):
@@ -353,10 +475,14 @@ class RAPIBulkConfig(BaseGetterConfig):
 class RRedisConfig(BaseGetterConfig):
     def __init__(self, key, key_type="LIST", per_limit=None, max_limit=None, filter_=None, max_retry=None,
                  random_min_sleep=None, random_max_sleep=None, host=None, port=None, db=None, password=None,
-                 timeout=None, encoding=None, need_del=None, direction=None, compress=None, **kwargs):
+                 timeout=None, encoding=None, need_del=None, direction=None, compress=None, pool_minsize=None,
+                 pool_maxsize=None, share_pool=None, group=DefaultVal.redis_stream_group, consumer=None, block=None,
+                 stream_field=DefaultVal.redis_stream_field, pop=False,
+                 compress_level=None, zstd_dict=None, compress_workers=None,
+                 cluster_nodes=None, shards=None, **kwargs):
         """
         :param key: redis key to get data
-        :param key_type: redis data type to operate, current only support LIST, HASH
+        :param key_type: redis data type to operate, current only support LIST, HASH, STREAM
         :param per_limit: how many items to get per time
         :param max_limit: get at most max_limit items, if not set, get all
         :param max_retry: if request fail, retry max_retry times
@@ -371,7 +497,33 @@ class RRedisConfig(BaseGetterConfig):
         :param encoding: redis object encoding -> str
         :param need_del:  whether need to del the key after get object from redis -> boolean
         :param direction: "L" or "R", left to right or roght to left
-        :param compress: whether compress data use zlib before write to redis -> boolean
+        :param compress: whether data is compressed in redis -> boolean, codec of each value(zlib, zstd or lz4)
+                         is detected when decoding, values are json loaded after decompressed
+        :param pool_minsize: min connections of redis pool -> int
+        :param pool_maxsize: max connections of redis pool -> int
+        :param share_pool: whether share one connection pool with other configs of same host, port, db and password
+                           in this process -> boolean
+        :param group: STREAM only, consumer group to read with XREADGROUP, created(from the start of stream) if
+                      not exists, consumers of same group share the entries of the stream
+        :param consumer: STREAM only, consumer name in group, default hostname-pid, entries delivered but not
+                         acknowledged(i.e. process crashed) are read again by the consumer with same name,
+                         entries of each batch are acknowledged(XACK) when the next batch is requested
+        :param block: STREAM only, milliseconds to block waiting for new entries, if no new entry arrived,
+                      reading is done, None means not block, 0 means block forever, blocking read takes a
+                      connection of the pool for itself until it returns, so it never stalls other commands
+                      sharing the pool
+        :param stream_field: STREAM only, field of stream entry contains the item
+        :param pop: LIST only, queue consumer mode, each batch is removed from the list atomically when read
+                    (LRANGE + LTRIM in one lua script), many getters can consume the same key concurrently,
+                    each item is read by exactly one getter, reading is done when the list is empty,
+                    need_del is ignored
+        :param compress_level: not used when reading, accepted for symmetry with WRedisConfig
+        :param zstd_dict: trained zstd dictionary used when writing, bytes or path of dictionary file
+        :param compress_workers: if > 1, decompress each batch in a thread pool with compress_workers threads
+        :param cluster_nodes: list of (host, port) or "redis://host:port" of redis cluster nodes, need package
+                              aioredis-cluster installed, host, port and db are ignored if set
+        :param shards: read a logical key sharded by WRedisConfig over shards physical keys(key:{0} ... key:{N-1}),
+                       shards are read concurrently, each batch comes from one shard
         :param kwargs:
 
         Example:
@@ -410,12 +562,30 @@ class RRedisConfig(BaseGetterConfig):
             need_del = DefaultVal.redis_need_del
         if compress is None:
             compress = DefaultVal.redis_compress
-
-        if not DefaultVal.main_config.has_redis_configured and port <= 0:
+        if compress_level is None:
+            compress_level = DefaultVal.redis_compress_level
+        if zstd_dict is None:
+            zstd_dict = DefaultVal.redis_zstd_dict
+        if compress_workers is None:
+            compress_workers = DefaultVal.redis_compress_workers
+        if cluster_nodes is None:
+            cluster_nodes = DefaultVal.redis_cluster_nodes
+        if pool_minsize is None:
+            pool_minsize = DefaultVal.redis_pool_minsize
+        if pool_maxsize is None:
+            pool_maxsize = DefaultVal.redis_pool_maxsize
+        if share_pool is None:
+            share_pool = DefaultVal.redis_share_pool
+
+        if not DefaultVal.main_config.has_redis_configured and port <= 0 and not cluster_nodes:
             raise ValueError("You must config redis before using Redis, Please edit configure file: %s" % (DefaultVal.main_config.ini_path, ))
 
-        if key_type not in ("LIST", "HASH"):
-            raise ValueError("key_type must be one of (%s)" % (str(("LIST", "HASH")), ))
+        if key_type not in ("LIST", "HASH", "STREAM"):
+            raise ValueError("key_type must be one of (%s)" % (str(("LIST", "HASH", "STREAM")), ))
+        if key_type == "STREAM" and not group:
+            raise ValueError("group must be set for STREAM key_type")
+        if not consumer:
+            consumer = "%s-%d" % (socket.gethostname(), os.getpid())
         if not encoding:
             raise ValueError("You must specific encoding, since I am going to load each object in json format, "
                              "and treat it as dictionary in python")
@@ -445,6 +615,23 @@ class RRedisConfig(BaseGetterConfig):
         self.redis_read_method = self.redis_len_method = self.redis_del_method = None
         self.direction = direction
         self.compress = compress
+        self.pool_minsize = pool_minsize
+        self.pool_maxsize = pool_maxsize
+        self.share_pool = share_pool
+        self.group = group
+        self.consumer = consumer
+        self.block = block
+        self.stream_field = stream_field
+        self.pop = pop
+        self.cluster_nodes = cluster_nodes
+        if shards is not None and shards <= 0:
+            raise ValueError("shards must be a positive integer")
+        self.shards = shards
+        self.keys = shard_keys(key, shards)
+        self.codec = RedisCodec(compress, encoding, level=compress_level, zstd_dict=zstd_dict,
+                                workers=compress_workers)
+        if pop and key_type != "LIST":
+            raise ValueError("pop only work for LIST key_type")
 
         if key_type == "LIST":
             self.is_range = True
@@ -456,23 +643,21 @@ class RRedisConfig(BaseGetterConfig):
         :return: an async redis client
         """
         if self.redis_pool_cli is None:
-            kwargs = {
-                "db": self.db,
-                "password": self.password,
-                "encoding": self.encoding,
-                "timeout": self.timeout,
-                "minsize": 1,
-                "maxsize": 3
-            }
-            if self.compress:
-                del kwargs["encoding"]
-            self.redis_pool_cli = await aioredis.create_redis_pool((self.host, self.port), **kwargs)
+            self.redis_pool_cli = await get_redis_pool(self.host, self.port, db=self.db, password=self.password,
+                                                       encoding=None if self.compress else self.encoding,
+                                                       timeout=self.timeout, minsize=self.pool_minsize,
+                                                       maxsize=self.pool_maxsize, shared=self.share_pool,
+                                                       cluster_nodes=self.cluster_nodes)
             if self.key_type == "LIST":
                 self.redis_read_method = self.redis_pool_cli.lrange
                 self.redis_len_method = self.redis_pool_cli.llen
                 self.redis_del_method = self.redis_pool_cli.ltrim
+            elif self.key_type == "STREAM":
+                self.redis_read_method = self.redis_pool_cli.xread_group
+                self.redis_len_method = self.redis_pool_cli.xlen
+                self.redis_del_method = self.redis_pool_cli.xack
             else:
-                self.redis_read_method = self.redis_pool_cli.hgetall
+                self.redis_read_method = self.redis_pool_cli.hscan
                 self.redis_len_method = self.redis_pool_cli.hlen
                 self.redis_del_method = self.redis_pool_cli.delete
 
@@ -482,7 +667,7 @@ class RRedisConfig(BaseGetterConfig):
 class RMySQLConfig(BaseGetterConfig):
     def __init__(self, table, per_limit=None, max_limit=None, filter_=None, max_retry=None, random_min_sleep=None,
                  random_max_sleep=None, host=None, port=None, user=None, password=None, database=None,
-                 charset=None, loop=None, **kwargs):
+                 charset=None, loop=None, keyset_field=None, stream=False, count=True, **kwargs):
         """
         :param table: mysql table
         :param per_limit: how many items to get per time
@@ -498,6 +683,14 @@ class RMySQLConfig(BaseGetterConfig):
         :param database: mysql database -> str
         :param charset: default utf8 -> str
         :param loop: async loop instance
+        :param keyset_field: a unique indexed column(i.e. primary key), if set, read page by page with
+                             "WHERE keyset_field > last value ORDER BY keyset_field" instead of "LIMIT offset, n",
+                             each page costs the same no matter how deep it is
+        :param stream: read the whole table with one query through an unbuffered server side cursor(SSCursor),
+                       rows are fetched per_limit at a time, ordered by keyset_field if set, a failure in the
+                       middle of reading is not retried
+        :param count: whether run "SELECT COUNT(*)" before reading, only used for progress percentage in log,
+                      it may take long for a huge InnoDB table
         :param kwargs:
 
         Example:
@@ -558,6 +751,10 @@ class RMySQLConfig(BaseGetterConfig):
         self.database = database
         self.charset = charset
 
+        self.keyset_field = keyset_field
+        self.stream = stream
+        self.count = count
+
         if not loop:
             loop = asyncio.get_event_loop()
         self.loop = loop
@@ -575,6 +772,13 @@ class RMySQLConfig(BaseGetterConfig):
             self.cursor = await self.connection.cursor()
         return self.mysql_pool_cli
 
+    async def get_stream_cursor(self):
+        """
+        :return: an unbuffered cursor on the same connection, rows are read from server when fetched
+        """
+        await self.get_mysql_pool_cli()
+        return await self.connection.cursor(aiomysql.SSCursor)
+
     def free_resource(self):
         if self.mysql_pool_cli is not None:
             self.mysql_pool_cli.release(self.connection)
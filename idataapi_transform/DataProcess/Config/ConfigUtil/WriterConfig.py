@@ -1,5 +1,4 @@
 import asyncio
-import aioredis
 import inspect
 
 try:
@@ -12,14 +11,21 @@ try:
 except Exception as e:
     pass
 
+try:
+    import pyarrow
+except Exception as e:
+    pass
+
 from .BaseConfig import BaseWriterConfig
 from ..ESConfig import get_es_client
-from ..DefaultValue import DefaultVal
+from ..RedisConfig import get_redis_pool, RedisCodec, shard_keys
+from ..DefaultValue import DefaultVal, IdHashFunc
 
 
 class WCSVConfig(BaseWriterConfig):
     def __init__(self, filename, mode=DefaultVal.default_file_mode_w, encoding=DefaultVal.default_encoding,
-                 headers=None, filter_=None, expand=None, qsn=DefaultVal.qsn, **kwargs):
+                 headers=None, filter_=None, expand=None, qsn=DefaultVal.qsn, evolve_headers=False,
+                 compression=None, **kwargs):
         """
         :param filename: filename to write
         :param mode: file open mode, i.e "w" or "a+"
@@ -28,6 +34,11 @@ class WCSVConfig(BaseWriterConfig):
         :param filter_: run "transform --help" to see command line interface explanation for detail
         :param expand: run "transform --help" to see command line interface explanation for detail
         :param qsn: run "transform --help" to see command line interface explanation for detail
+        :param evolve_headers: if True, new keys in later items become new columns instead of raising error,
+                               items are spooled to a temporary file, and the csv file with full headers
+                               is written when __exit__ of CSVWriter called
+        :param compression: "gzip", "zstd", "lz4" or "none", if not set, detect by suffix of filename, i.e ".gz",
+                            compression is done in a background thread
         :param kwargs:
 
         Example:
@@ -46,13 +57,15 @@ class WCSVConfig(BaseWriterConfig):
         self.filter = filter_
         self.expand = expand
         self.qsn = qsn
+        self.evolve_headers = evolve_headers
+        self.compression = compression
 
 
 class WESConfig(BaseWriterConfig):
     def __init__(self, indices, doc_type, filter_=None, expand=None, id_hash_func=DefaultVal.default_id_hash_func,
                  appCode=None, actions=None, createDate=None, error_if_fail=True, timeout=None, max_retry=None,
                  random_min_sleep=None, random_max_sleep=None, auto_insert_createDate=True, hosts=None, headers=None,
-                 **kwargs):
+                 bulk_mode=False, bulk_settings=None, **kwargs):
         """
         :param indices: elasticsearch indices
         :param doc_type: elasticsearch doc_type
@@ -70,6 +83,10 @@ class WESConfig(BaseWriterConfig):
         :param auto_insert_createDate: whether insert createDate for each item automatic -> boolean
         :param hosts: elasticsearch hosts, list type, i.e: ["localhost:8888", "127.0.0.2:8889"]
         :param headers: headers when perform http requests to elasticsearch, dict type, i.e: {"Host": "aaa", "apikey": "bbb"}
+        :param bulk_mode: if True, switch indices to ingest optimised settings(no refresh, no replicas, async translog)
+                          when enter the writer, restore original settings and refresh when exit, the writer
+                          must be used with "async with", write raise ValueError otherwise -> boolean
+        :param bulk_settings: flat index settings for bulk_mode, default DefaultVal.es_bulk_settings
         :param kwargs:
 
         Example:
@@ -106,11 +123,14 @@ class WESConfig(BaseWriterConfig):
         self.random_min_sleep = random_min_sleep
         self.random_max_sleep = random_max_sleep
         self.auto_insert_createDate = auto_insert_createDate
+        self.bulk_mode = bulk_mode
+        self.bulk_settings = bulk_settings if bulk_settings else DefaultVal.es_bulk_settings
 
 
 class WJsonConfig(BaseWriterConfig):
     def __init__(self, filename, mode=DefaultVal.default_file_mode_w, encoding=DefaultVal.default_encoding,
-                 expand=None, filter_=None, new_line=DefaultVal.new_line, **kwargs):
+                 expand=None, filter_=None, new_line=DefaultVal.new_line, compression=None,
+                 buffer_size=DefaultVal.file_buffer_size, max_file_size=None, max_items_per_file=None, **kwargs):
         """
         :param filename: filename to write
         :param mode: file open mode, i.e "w" or "a+"
@@ -118,6 +138,12 @@ class WJsonConfig(BaseWriterConfig):
         :param expand: run "transform --help" to see command line interface explanation for detail
         :param filter_: run "transform --help" to see command line interface explanation for detail
         :param new_line: new_line seperator for each item, default is "\n"
+        :param compression: "gzip", "zstd", "lz4" or "none", if not set, detect by suffix of filename, i.e ".gz",
+                            compression is done in a background thread
+        :param buffer_size: bytes buffered before written to disk, each page of items is serialised and written at once
+        :param max_file_size: rotate to a new part file when this many characters(before compression) are written,
+                              part files are named "result.00000.json", "result.00001.json", ...
+        :param max_items_per_file: rotate to a new part file when this many items are written
         :param kwargs:
 
         Example:
@@ -134,11 +160,20 @@ class WJsonConfig(BaseWriterConfig):
         self.expand = expand
         self.filter = filter_
         self.new_line = new_line
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.max_file_size = max_file_size
+        self.max_items_per_file = max_items_per_file
+        if max_file_size is not None and max_file_size <= 0:
+            raise ValueError("max_file_size must be a positive integer")
+        if max_items_per_file is not None and max_items_per_file <= 0:
+            raise ValueError("max_items_per_file must be a positive integer")
 
 
 class WTXTConfig(BaseWriterConfig):
     def __init__(self, filename, mode=DefaultVal.default_file_mode_w, encoding=DefaultVal.default_encoding,
-                 expand=None, filter_=None, new_line=DefaultVal.new_line, join_val=DefaultVal.join_val, **kwargs):
+                 expand=None, filter_=None, new_line=DefaultVal.new_line, join_val=DefaultVal.join_val,
+                 compression=None, **kwargs):
         """
         :param filename: filename to write
         :param mode: file open mode, i.e "w" or "a+"
@@ -147,6 +182,8 @@ class WTXTConfig(BaseWriterConfig):
         :param filter_: run "transform --help" to see command line interface explanation for detail
         :param new_line: new_line seperator for each item, default is "\n"
         :param join_val: space seperator for each key in each item, default is " "
+        :param compression: "gzip", "zstd", "lz4" or "none", if not set, detect by suffix of filename, i.e ".gz",
+                            compression is done in a background thread
         :param kwargs:
 
         Example:
@@ -164,10 +201,12 @@ class WTXTConfig(BaseWriterConfig):
         self.filter = filter_
         self.new_line = new_line
         self.join_val = join_val
+        self.compression = compression
 
 
 class WXLSXConfig(BaseWriterConfig):
-    def __init__(self, filename, mode=DefaultVal.default_file_mode_w, title=DefaultVal.title, expand=None, filter_=None, headers=None, sheet_index=0, **kwargs):
+    def __init__(self, filename, mode=DefaultVal.default_file_mode_w, title=DefaultVal.title, expand=None, filter_=None, headers=None, sheet_index=0,
+                 streaming=False, max_rows_per_sheet=DefaultVal.xlsx_max_rows, **kwargs):
         """
         :param filename: filename to write
         :param mode: file open mode, i.e "w" or "a+"
@@ -176,6 +215,11 @@ class WXLSXConfig(BaseWriterConfig):
         :param filter_: run "transform --help" to see command line interface explanation for detail
         :param headers: xlsx headers in first row, if not set, automatically extract in first bulk of items
         :param sheet_index: which sheet to get, 0 means 0th sheet, only work for append mode
+        :param streaming: use write-only worksheet, rows are flushed to disk as they arrive instead of building
+                          the whole workbook in memory, not work for append mode,
+                          keys first seen after headers written are appended as new columns without header
+        :param max_rows_per_sheet: only work for streaming mode, when a sheet is full(headers included),
+                                   continue in a new sheet named title_1, title_2 ...
         :param kwargs:
 
         Example:
@@ -193,15 +237,67 @@ class WXLSXConfig(BaseWriterConfig):
         self.filter = filter_
         self.headers = headers
         self.sheet_index = sheet_index
+        self.streaming = streaming
+        self.max_rows_per_sheet = max_rows_per_sheet
+        if streaming and "a" in mode:
+            raise ValueError("streaming mode can't append to exists file, mode must be \"w\"")
+        if max_rows_per_sheet < 2:
+            raise ValueError("max_rows_per_sheet must be at least 2")
+
+
+class WParquetConfig(BaseWriterConfig):
+    def __init__(self, filename, mode=DefaultVal.default_file_mode_w, expand=None, filter_=None, schema=None,
+                 row_group_size=DefaultVal.parquet_row_group_size, compression=DefaultVal.parquet_compression,
+                 use_dictionary=True, **kwargs):
+        """
+        :param filename: filename to write
+        :param mode: file open mode, only "w" supported, parquet file can't be appended
+        :param expand: run "transform --help" to see command line interface explanation for detail
+        :param filter_: run "transform --help" to see command line interface explanation for detail
+        :param schema: pyarrow.Schema of the file, if not set, infer from the first row group of items,
+                       keys not in schema are dropped, values can't convert to the column type are written as null
+        :param row_group_size: items buffered and written as one row group
+        :param compression: "snappy", "gzip", "zstd", "brotli", "lz4" or "none"
+        :param use_dictionary: dictionary encoding for columns, True/False, or list of column names
+        :param kwargs:
+
+        Example:
+            ...
+            parquet_config = WParquetConfig("./result.parquet")
+            with ProcessFactory.create_writer(parquet_config) as parquet_writer:
+                async for items in es_getter:
+                    parquet_writer.write(items)
+        """
+        super().__init__()
+        if "pyarrow" not in globals():
+            raise ValueError("module parquet disabled, please install package pyarrow to enable it")
+        if "a" in mode:
+            raise ValueError("parquet file can't be appended, mode must be \"w\"")
+        if not row_group_size or row_group_size <= 0:
+            raise ValueError("row_group_size must be a positive integer")
+
+        self.filename = filename
+        self.mode = mode
+        self.expand = expand
+        self.filter = filter_
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.use_dictionary = use_dictionary
 
 
 class WRedisConfig(BaseWriterConfig):
     def __init__(self, key, key_type="LIST", filter_=None, host=None, port=None, db=None, password=None, timeout=None,
                  encoding=None, direction=None, max_retry=None, random_min_sleep=None, random_max_sleep=None,
-                 compress=None, **kwargs):
+                 compress=None, chunk_size=DefaultVal.redis_chunk_size,
+                 pipeline_chunks=DefaultVal.redis_pipeline_chunks, transaction=False, pool_minsize=None,
+                 pool_maxsize=None, share_pool=None, max_len=None, stream_field=DefaultVal.redis_stream_field,
+                 id_hash_func=DefaultVal.default_id_hash_func, expire=None,
+                 compress_level=None, zstd_dict=None, compress_workers=None,
+                 cluster_nodes=None, shards=None, **kwargs):
         """
         :param key: redis key to write data
-        :param key_type: redis data type to operate, current only support LIST, HASH
+        :param key_type: redis data type to operate, current only support LIST, HASH, STREAM
         :param filter_: run "transform --help" to see command line interface explanation for detail
         :param host: redis host -> str
         :param port: redis port -> int
@@ -210,7 +306,34 @@ class WRedisConfig(BaseWriterConfig):
         :param timeout: timeout per redis connection -> float
         :param encoding: redis object encoding -> str
         :param direction: "L" or "R", lpush or rpush
-        :param compress: whether compress data use zlib before write to redis -> boolean
+        :param compress: whether compress data before write to redis, True or "zlib" means zlib, "zstd" or "lz4"
+                         need package zstandard or lz4 installed, getter detects codec of each value
+        :param chunk_size: at most chunk_size items per LPUSH/RPUSH/HMSET command(or XADD commands per chunk for
+                           STREAM), so that a huge page won't block redis in one command
+        :param pipeline_chunks: number of chunks sent in one pipeline, when retry after failure,
+                                pipelines already executed are not sent again
+        :param transaction: push all chunks of each write in one MULTI/EXEC transaction, commands are applied
+                            together without interleaving with other clients, but redis has no rollback, if a
+                            command fails(i.e. WRONGTYPE) the others are still applied, only chunks failed are
+                            sent again when retry
+        :param pool_minsize: min connections of redis pool -> int
+        :param pool_maxsize: max connections of redis pool -> int
+        :param share_pool: whether share one connection pool with other configs of same host, port, db and password
+                           in this process -> boolean
+        :param max_len: STREAM only, trim the stream to about max_len entries(XADD MAXLEN ~) -> int
+        :param stream_field: STREAM only, each item is saved in this field of a stream entry
+        :param id_hash_func: HASH only, function to generate hash field for each item, only if "id" not in item
+                             will I use 'id_hash_func' to generate field, otherwise item["id"] is the field
+        :param expire: set time to live of key in seconds after each write, None means never expire -> int
+        :param compress_level: compression level of codec, None means default level
+        :param zstd_dict: zstd only, trained dictionary(see RedisConfig.train_zstd_dict), bytes or path of
+                          dictionary file, getter must use the same dictionary
+        :param compress_workers: if > 1, compress each batch in a thread pool with compress_workers threads
+        :param cluster_nodes: list of (host, port) or "redis://host:port" of redis cluster nodes, need package
+                              aioredis-cluster installed, host, port and db are ignored if set
+        :param shards: spread items of key over shards physical keys(key:{0} ... key:{N-1}), so that a hot key
+                       is spread over nodes of redis cluster, chunks are written round robin(HASH field always
+                       goes to the same shard), shards are written concurrently, transaction is per shard
         :param kwargs:
 
         Example:
@@ -243,12 +366,26 @@ class WRedisConfig(BaseWriterConfig):
             direction = DefaultVal.redis_direction
         if compress is None:
             compress = DefaultVal.redis_compress
+        if compress_level is None:
+            compress_level = DefaultVal.redis_compress_level
+        if zstd_dict is None:
+            zstd_dict = DefaultVal.redis_zstd_dict
+        if compress_workers is None:
+            compress_workers = DefaultVal.redis_compress_workers
+        if cluster_nodes is None:
+            cluster_nodes = DefaultVal.redis_cluster_nodes
+        if pool_minsize is None:
+            pool_minsize = DefaultVal.redis_pool_minsize
+        if pool_maxsize is None:
+            pool_maxsize = DefaultVal.redis_pool_maxsize
+        if share_pool is None:
+            share_pool = DefaultVal.redis_share_pool
 
         # check value
-        if not DefaultVal.main_config.has_redis_configured and port <= 0:
+        if not DefaultVal.main_config.has_redis_configured and port <= 0 and not cluster_nodes:
             raise ValueError("You must config redis before using Redis, Please edit configure file: %s" % (DefaultVal.main_config.ini_path, ))
-        if key_type not in ("LIST", "HASH"):
-            raise ValueError("key_type must be one of (%s)" % (str(("LIST", )), ))
+        if key_type not in ("LIST", "HASH", "STREAM"):
+            raise ValueError("key_type must be one of (%s)" % (str(("LIST", "HASH", "STREAM")), ))
         if not encoding:
             raise ValueError("You must specific encoding, since I am going to load each object in json format, "
                              "and treat it as dictionary in python")
@@ -269,12 +406,32 @@ class WRedisConfig(BaseWriterConfig):
 
         self.name = "%s_%s->%s" % (str(host), str(port), str(key))
 
-        self.redis_write_method = None
         self.direction = direction
         self.max_retry = max_retry
         self.random_min_sleep = random_min_sleep
         self.random_max_sleep = random_max_sleep
         self.compress = compress
+        self.pool_minsize = pool_minsize
+        self.pool_maxsize = pool_maxsize
+        self.share_pool = share_pool
+        self.chunk_size = chunk_size
+        self.pipeline_chunks = pipeline_chunks
+        self.transaction = transaction
+        if not chunk_size or chunk_size <= 0:
+            raise ValueError("chunk_size must be a positive integer")
+        if not pipeline_chunks or pipeline_chunks <= 0:
+            raise ValueError("pipeline_chunks must be a positive integer")
+        self.max_len = max_len
+        self.stream_field = stream_field
+        self.id_hash_func = id_hash_func
+        self.expire = expire
+        self.cluster_nodes = cluster_nodes
+        if shards is not None and shards <= 0:
+            raise ValueError("shards must be a positive integer")
+        self.shards = shards
+        self.keys = shard_keys(key, shards)
+        self.codec = RedisCodec(compress, encoding, level=compress_level, zstd_dict=zstd_dict,
+                                workers=compress_workers)
 
         if key_type == "LIST":
             self.is_range = True
@@ -286,25 +443,11 @@ class WRedisConfig(BaseWriterConfig):
         :return: an async redis client
         """
         if self.redis_pool_cli is None:
-            kwargs = {
-                "db": self.db,
-                "password": self.password,
-                "encoding": self.encoding,
-                "timeout": self.timeout,
-                "minsize": 1,
-                "maxsize": 3
-            }
-            if self.compress:
-                del kwargs["encoding"]
-            self.redis_pool_cli = await aioredis.create_redis_pool((self.host, self.port), **kwargs)
-            if self.key_type == "LIST":
-                if self.direction == "L":
-                    self.redis_write_method = self.redis_pool_cli.lpush
-                else:
-                    self.redis_write_method = self.redis_pool_cli.rpush
-            else:
-                self.redis_write_method = self.redis_pool_cli.hset
-
+            self.redis_pool_cli = await get_redis_pool(self.host, self.port, db=self.db, password=self.password,
+                                                       encoding=None if self.compress else self.encoding,
+                                                       timeout=self.timeout, minsize=self.pool_minsize,
+                                                       maxsize=self.pool_maxsize, shared=self.share_pool,
+                                                       cluster_nodes=self.cluster_nodes)
         return self.redis_pool_cli
 
 
@@ -1,7 +1,64 @@
 import os
+import json
 import hashlib
+import logging
 from .MainConfig import main_config
 
+try:
+    import xxhash
+except Exception as e:
+    xxhash = None
+
+
+class IdHashFunc(object):
+    def __init__(self, algorithm="md5", digest_size=16, canonical=False):
+        """
+        generate id for each item, hash of "appCode_id" if item has both appCode and id, else hash of the whole item
+
+        :param algorithm: "md5", "blake2b" or "xxhash"(need package xxhash installed)
+        :param digest_size: digest size in bytes, only work for "blake2b"(1 - 64) and "xxhash"(8 or 16)
+        :param canonical: if True, serialise the whole item with sorted keys instead of str(item), so that
+                          the same item always get the same id no matter the order of keys
+        """
+        if algorithm == "md5":
+            self.hash_func = hashlib.md5
+        elif algorithm == "blake2b":
+            self.hash_func = lambda value: hashlib.blake2b(value, digest_size=digest_size)
+        elif algorithm == "xxhash":
+            if xxhash is None:
+                raise ValueError("id hash algorithm xxhash disabled, please install package xxhash to enable it")
+            if digest_size == 8:
+                self.hash_func = xxhash.xxh64
+            elif digest_size == 16:
+                self.hash_func = xxhash.xxh3_128 if hasattr(xxhash, "xxh3_128") else xxhash.xxh128
+            else:
+                raise ValueError("digest_size of xxhash must be 8 or 16")
+        else:
+            raise ValueError("id hash algorithm must be one of (%s)" % (str(("md5", "blake2b", "xxhash")), ))
+        self.algorithm = algorithm
+        self.digest_size = digest_size
+        self.canonical = canonical
+
+    def __call__(self, item):
+        return self.hash_func(self.serialise(item)).hexdigest()
+
+    def batch(self, items):
+        """
+        :return: list of id, one for each item
+        """
+        hash_func = self.hash_func
+        serialise = self.serialise
+        return [hash_func(serialise(item)).hexdigest() for item in items]
+
+    def serialise(self, item):
+        if "appCode" in item and item["appCode"] and "id" in item and item["id"]:
+            return (item["appCode"] + "_" + item["id"]).encode("utf8")
+        elif self.canonical:
+            return json.dumps(item, sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+                              default=str).encode("utf8")
+        else:
+            return str(item).encode("utf8")
+
 
 class DefaultValObject(object):
     def __init__(self):
@@ -27,8 +84,19 @@ class DefaultValObject(object):
         self.redis_timeout = self.main_config["redis"].getint("timeout")
         self.redis_encoding = self.main_config["redis"].get("encoding")
         self.redis_direction = self.main_config["redis"].get("direction")
-        self.redis_compress = self.main_config["redis"].getboolean("compress")
+        self.redis_compress = self.main_config["redis"].get("compress")
+        if self.redis_compress not in ("zlib", "zstd", "lz4"):
+            self.redis_compress = self.main_config["redis"].getboolean("compress")
+        self.redis_compress_level = self.main_config["redis"].getint("compress_level")
+        self.redis_zstd_dict = self.main_config["redis"].get("zstd_dict") or None
+        self.redis_compress_workers = self.main_config["redis"].getint("compress_workers")
+        # host:port,host:port
+        self.redis_cluster_nodes = ["redis://%s" % (node.strip(), ) for node in
+                                    self.main_config["redis"].get("cluster_nodes", "").split(",") if node.strip()]
         self.redis_need_del = self.main_config["redis"].getboolean("need_del")
+        self.redis_pool_minsize = self.main_config["redis"].getint("pool_minsize", 1)
+        self.redis_pool_maxsize = self.main_config["redis"].getint("pool_maxsize", 10)
+        self.redis_share_pool = self.main_config["redis"].getboolean("share_pool", True)
 
         # mysql config
         self.mysql_host = self.main_config["mysql"].get("host")
@@ -47,6 +115,17 @@ class DefaultValObject(object):
         self.mongo_password = self.main_config["mongo"].get("password")
         self.mongo_database = self.main_config["mongo"].get("database")
 
+        # id hash
+        canonical = self.main_config["main"].getboolean("id_hash_canonical", False)
+        try:
+            self.default_id_hash_func = IdHashFunc(
+                self.main_config["main"].get("id_hash_algorithm", "md5"),
+                self.main_config["main"].getint("id_hash_digest_size", 16), canonical)
+        except ValueError as e:
+            # a bad ini must not break importing the package
+            logging.warning("%s, fall back to default id hash algorithm md5" % (str(e), ))
+            self.default_id_hash_func = IdHashFunc("md5", canonical=canonical)
+
     default_file_mode_r = "r"
     default_file_mode_w = "w"
     default_encoding = "utf8"
@@ -65,14 +144,37 @@ class DefaultValObject(object):
     success_ret_code = ("100002", "100301", "100103")
     trim_to_max_limit = False
     exclude_filtered_to_max_limit = True
+    # bytes per chunk when CSVGetter read file in parallel
+    csv_chunk_size = 16 * 1024 * 1024
+    # bytes buffered by file writer before written to disk
+    file_buffer_size = 1024 * 1024
 
-    @staticmethod
-    def default_id_hash_func(item):
-        if "appCode" in item and item["appCode"] and "id" in item and item["id"]:
-            value = (item["appCode"] + "_" + item["id"]).encode("utf8")
-        else:
-            value = str(item).encode("utf8")
-        return hashlib.md5(value).hexdigest()
+    # items per LPUSH/RPUSH command, and commands sent in one pipeline
+    redis_chunk_size = 500
+    redis_pipeline_chunks = 8
+    # field name of each stream entry, and default consumer group
+    redis_stream_field = "data"
+    redis_stream_group = "idataapi_transform"
+    # records cached by RedisLookup
+    redis_lookup_cache_size = 10000
+
+    # max rows of a xlsx sheet
+    xlsx_max_rows = 1048576
+
+    # parquet
+    parquet_row_group_size = 64 * 1024
+    parquet_compression = "snappy"
+
+    # elasticsearch background task
+    es_slices = "auto"
+    es_requests_per_second = None
+    es_task_poll_interval = 5
+    # index settings for ESWriter in bulk_mode, restored after write done
+    es_bulk_settings = {
+        "index.refresh_interval": "-1",
+        "index.number_of_replicas": "0",
+        "index.translog.durability": "async"
+    }
 
 
 DefaultVal = DefaultValObject()
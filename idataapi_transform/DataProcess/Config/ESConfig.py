@@ -166,7 +166,6 @@ def init_es(hosts, es_headers, timeout_):
                                  create_date=None, error_if_fail=True, timeout=None, auto_insert_createDate=True):
             if not actions:
                 actions = "index"
-            body = ""
             for item in items:
                 if app_code:
                     item["appCode"] = app_code
@@ -176,16 +175,25 @@ def init_es(hosts, es_headers, timeout_):
                     else:
                         item["createDate"] = int(time.time())
 
+            if hasattr(id_hash_func, "batch"):
+                ids = id_hash_func.batch(items)
+            else:
+                ids = [id_hash_func(item) for item in items]
+
+            lines = list()
+            for item, id_ in zip(items, ids):
                 action = {
                     actions: {
                         "_index": indices,
                         "_type": doc_type,
-                        "_id": id_hash_func(item)
+                        "_id": id_
                     }
                 }
                 if actions == "update":
                     item = {"doc": item}
-                body += json.dumps(action) + "\n" + json.dumps(item) + "\n"
+                lines.append(json.dumps(action))
+                lines.append(json.dumps(item))
+            body = "\n".join(lines) + "\n"
             try:
                 success = fail = 0
                 r = await self.transport.perform_request("POST", "/_bulk?pretty", body=body, timeout=timeout, headers=self.headers)
@@ -208,6 +216,46 @@ def init_es(hosts, es_headers, timeout_):
                 logging.error("elasticsearch Exception, give up: %s" % (str(e), ))
                 return None, None, None
 
+        async def wait_for_task(self, task_id, poll_interval=5, name=None):
+            """
+            poll tasks API until task finished, log progress each time
+            :return: task result, i.e {"completed": true, "task": {...}, "response": {...}}
+            """
+            name = name if name else task_id
+            while True:
+                r = await self.tasks.get(task_id=task_id)
+                status = r["task"]["status"]
+                total = status.get("total", 0)
+                done = status.get("created", 0) + status.get("updated", 0) + status.get("deleted", 0) + \
+                    status.get("noops", 0) + status.get("version_conflicts", 0)
+                logging.info("task %s: %d/%d documents processed, version conflicts: %d, percentage: %.2f%%" %
+                             (name, done, total, status.get("version_conflicts", 0),
+                              (done / total * 100) if total else 0))
+                if r.get("completed"):
+                    if "error" in r:
+                        logging.error("task %s fail: %s" % (name, json.dumps(r["error"])))
+                    elif r.get("response", {}).get("failures"):
+                        logging.error("task %s done with failures: %s" % (name, json.dumps(r["response"]["failures"])))
+                    return r
+                await asyncio.sleep(poll_interval)
+
+        async def perform_task(self, method, *args, slices="auto", requests_per_second=None, poll_interval=5,
+                               name=None, **kwargs):
+            """
+            launch a by_query/reindex API in background, with wait_for_completion=false, then poll until it finished
+            :param method: one of delete_by_query, update_by_query, reindex
+            :param slices: number of slices to parallelize the task, "auto" means one slice per shard
+            :param requests_per_second: throttle for the task, None means no throttle
+            :return: the response of the finished task, same as the response when wait_for_completion=true
+            """
+            r = await getattr(self, method)(*args, wait_for_completion=False, slices=slices,
+                                            requests_per_second=requests_per_second, **kwargs)
+            task_id = r["task"]
+            logging.info("%s launched in background, task id: %s" % (method, task_id))
+            r = await self.wait_for_task(task_id, poll_interval=poll_interval,
+                                         name="%s(%s)" % (method, name if name else task_id))
+            return r.get("response", r)
+
         @query_params('_source', '_source_exclude', '_source_include',
                       'allow_no_indices', 'allow_partial_search_results', 'analyze_wildcard',
                       'analyzer', 'batched_reduce_size', 'default_operator', 'df',
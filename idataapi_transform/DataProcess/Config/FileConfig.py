@@ -0,0 +1,145 @@
+import io
+import os
+import gzip
+import queue
+import threading
+
+try:
+    import zstandard
+except Exception as e:
+    pass
+
+try:
+    import lz4.frame
+except Exception as e:
+    pass
+
+compression_suffix = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+    ".lz4": "lz4"
+}
+
+compression_choices = ("gzip", "zstd", "lz4")
+
+# bytes buffered before handing to the compress thread
+compress_buffer_size = 1024 * 1024
+
+
+def get_compression(filename, compression=None):
+    """
+    :param compression: "gzip", "zstd", "lz4" or "none", if not set, detect by suffix of filename
+    :return: one of compression_choices, or None for plain file
+    """
+    if compression:
+        if compression == "none":
+            return None
+        if compression not in compression_choices:
+            raise ValueError("compression must be one of (%s)" % (str(compression_choices), ))
+        return compression
+    for suffix, name in compression_suffix.items():
+        if filename.endswith(suffix):
+            return name
+    return None
+
+
+class BackgroundWriter(io.RawIOBase):
+    def __init__(self, raw, queue_size=16):
+        """
+        write to raw in a background thread, so that compression won't block the caller
+        """
+        super().__init__()
+        self.raw = raw
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(bytes(b))
+        return len(b)
+
+    def run(self):
+        while True:
+            b = self.queue.get()
+            try:
+                if b is None:
+                    break
+                if self.error is None:
+                    self.raw.write(b)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        if not self.closed:
+            self.queue.join()
+            if self.error is not None:
+                raise self.error
+
+    def close(self):
+        if not self.closed:
+            self.queue.put(None)
+            self.thread.join()
+            self.raw.close()
+            super().close()
+            if self.error is not None:
+                raise self.error
+
+
+def open_binary(filename, mode, compression):
+    if compression == "gzip":
+        return gzip.open(filename, mode)
+    elif compression == "zstd":
+        if "zstandard" not in globals():
+            raise ValueError("module zstandard disabled, please install package zstandard to enable it")
+        return zstandard.open(filename, mode)
+    else:
+        if "lz4" not in globals():
+            raise ValueError("module lz4 disabled, please install package lz4 to enable it")
+        return lz4.frame.open(filename, mode)
+
+
+def open_file(filename, mode="r", encoding=None, compression=None, newline=None, errors=None, buffering=-1):
+    """
+    same as builtin open in text mode, but transparently compress/decompress file with gzip, zstd or lz4,
+    when writing, compression is done in a background thread,
+    append mode add a new member(frame) to the end of file, readers read all members
+
+    :param compression: "gzip", "zstd", "lz4" or "none", if not set, detect by suffix of filename
+    :param buffering: same as builtin open, bytes buffered before written to disk(or handed to the compress thread)
+    """
+    compression = get_compression(filename, compression)
+    if not compression:
+        return open(filename, mode, buffering=buffering, encoding=encoding, newline=newline, errors=errors)
+
+    if "r" in mode:
+        raw = open_binary(filename, "rb", compression)
+    else:
+        raw = open_binary(filename, "ab" if "a" in mode else "wb", compression)
+        raw = io.BufferedWriter(BackgroundWriter(raw),
+                                buffer_size=buffering if buffering > 1 else compress_buffer_size)
+    return io.TextIOWrapper(raw, encoding=encoding, newline=newline, errors=errors)
+
+
+def part_filename(filename, index):
+    """
+    numbered part file of filename, compression suffix kept at the end
+    i.e part_filename("./result.json.gz", 3) ==> "./result.00003.json.gz"
+    """
+    compress_suffix = ""
+    for suffix in compression_suffix:
+        if filename.endswith(suffix):
+            compress_suffix = suffix
+            filename = filename[:-len(suffix)]
+            break
+    base, ext = os.path.splitext(filename)
+    return "%s.%05d%s%s" % (base, index, ext, compress_suffix)
@@ -0,0 +1,102 @@
+import os
+import mmap
+import array
+import bisect
+import logging
+
+
+class LineOffsetIndex(object):
+    magic = 0x31584449534e4f4a  # "JSONIDX1"
+    header_length = 3  # magic, size of source file, mtime of source file
+    flush_length = 1024 * 1024
+
+    def __init__(self, filename, index_filename=None):
+        """
+        byte offset of each line of a line by line file, saved in a sidecar file, memory mapped when used
+        the sidecar file is built once, and rebuilt if size or mtime of the source file changed
+
+        :param filename: line by line file
+        :param index_filename: sidecar file to save the index, default filename + ".idx"
+        """
+        self.mm = None
+        self.filename = filename
+        self.index_filename = index_filename if index_filename else filename + ".idx"
+        stat = os.stat(self.filename)
+        self.header = array.array("Q", [self.magic, stat.st_size, stat.st_mtime_ns])
+        if not self.is_valid():
+            self.build()
+
+        self.f_index = open(self.index_filename, "rb")
+        self.mm = mmap.mmap(self.f_index.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.mm)
+        # offsets[i] is the start of line i, the last one is the size of file
+        self.offsets = view[self.header_length * self.header.itemsize:].cast("Q")
+        view.release()
+
+    def is_valid(self):
+        if not os.path.exists(self.index_filename):
+            return False
+        with open(self.index_filename, "rb") as f:
+            header = array.array("Q")
+            try:
+                header.fromfile(f, self.header_length)
+            except EOFError:
+                return False
+        return header == self.header
+
+    def build(self):
+        logging.info("building line offset index for %s to %s" % (self.filename, self.index_filename))
+        tmp_filename = self.index_filename + ".tmp"
+        offsets = array.array("Q")
+        pos = 0
+        count = 0
+        with open(self.filename, "rb") as f_in, open(tmp_filename, "wb") as f_out:
+            self.header.tofile(f_out)
+            for line in f_in:
+                offsets.append(pos)
+                pos += len(line)
+                if len(offsets) >= self.flush_length:
+                    count += len(offsets)
+                    offsets.tofile(f_out)
+                    offsets = array.array("Q")
+            offsets.append(pos)
+            count += len(offsets) - 1
+            offsets.tofile(f_out)
+        os.replace(tmp_filename, self.index_filename)
+        logging.info("line offset index for %s built, total %d lines" % (self.filename, count))
+
+    def __len__(self):
+        """
+        :return: number of lines
+        """
+        return len(self.offsets) - 1
+
+    def offset(self, line):
+        """
+        :return: byte offset of the start of line, offset(len(index)) is the size of file
+        """
+        return self.offsets[min(line, len(self))]
+
+    def line_of(self, offset):
+        """
+        :return: the first line starting at or after offset
+        """
+        return bisect.bisect_left(self.offsets, offset)
+
+    def split(self, n, start_line=0, end_line=None):
+        """
+        :return: at most n (start_line, end_line) ranges with nearly same number of lines
+        """
+        end_line = len(self) if end_line is None else min(end_line, len(self))
+        step = max((end_line - start_line + n - 1) // n, 1)
+        return [(i, min(i + step, end_line)) for i in range(start_line, end_line, step)]
+
+    def close(self):
+        if self.mm is not None:
+            self.offsets.release()
+            self.mm.close()
+            self.f_index.close()
+            self.mm = None
+
+    def __del__(self):
+        self.close()
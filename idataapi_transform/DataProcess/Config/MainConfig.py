@@ -24,6 +24,14 @@ max_retry = 3
 random_min_sleep = 1
 random_max_sleep = 3
 
+# hash function to generate id for ESWriter and MongoWriter, one of md5, blake2b, xxhash
+# md5 is used instead, with a warning, if xxhash is selected but package xxhash is not installed
+# id_hash_algorithm = md5
+# digest size in bytes, only work for blake2b and xxhash(8 or 16)
+# id_hash_digest_size = 16
+# serialise item with sorted keys when item has no appCode and id, 0 means str(item), 1 means sorted json
+# id_hash_canonical = 0
+
 [es]
 # elasticsearch host
 # hosts = ["localhost:9393"]
@@ -54,6 +62,18 @@ encoding = utf8
 need_del = 0
 # default direction when read/write , "L" means lpop/lpush, "R" means rpop/rpush
 direction = L
+# connection pool size of each redis pool
+pool_minsize = 1
+pool_maxsize = 10
+# whether configs with same host, port, db and password share one connection pool, 0 means false, 1 means true
+# pool size of the config creating the pool is used, blocking STREAM reads take a connection of the pool for themselves
+share_pool = 1
+# compress value before write to redis, 0 means no compression, 1 or zlib, zstd, lz4
+compress = 0
+# path of trained zstd dictionary, optional
+zstd_dict = 
+# redis cluster nodes, i.e. 10.0.0.1:7000,10.0.0.2:7000, host and port are ignored if set
+cluster_nodes = 
 """
 
 mysql_config_content = """
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import json
+import zlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import aioredis
+
+try:
+    import aioredis_cluster
+except Exception as e:
+    pass
+
+try:
+    import zstandard
+except Exception as e:
+    pass
+
+try:
+    import lz4.block
+except Exception as e:
+    pass
+
+# (address, db, password, encoding, loop) ==> future of redis pool, address is (host, port) or cluster nodes
+_pools = dict()
+# same key as _pools ==> (minsize, maxsize) the pool is created with
+_pool_sizes = dict()
+
+
+async def get_redis_pool(host, port, db=None, password=None, encoding=None, timeout=None, minsize=1, maxsize=10,
+                         shared=True, cluster_nodes=None):
+    """
+    :param encoding: None means return bytes, i.e compressed value
+    :param shared: if True, configs with same host, port, db, password and encoding share one pool in this process,
+                   the pool size of the first config creating the pool is used(a warning is logged if a later
+                   config asks for another size), blocking commands must run on a connection acquired from the
+                   pool, i.e. "with await cli as conn", otherwise they stall other users of the pool
+    :param cluster_nodes: list of (host, port) or "redis://host:port" of redis cluster nodes, if set, host, port and
+                          db are ignored, client routes each command to the node owns the key
+    :return: an async redis client with connection pool
+    """
+    kwargs = {
+        "db": db,
+        "password": password,
+        "encoding": encoding,
+        "timeout": timeout,
+        "minsize": minsize,
+        "maxsize": maxsize
+    }
+    if cluster_nodes:
+        if "aioredis_cluster" not in globals():
+            raise ValueError("redis cluster disabled, please install package aioredis-cluster to enable it")
+        cluster_nodes = tuple(tuple(node) if isinstance(node, (list, tuple)) else node for node in cluster_nodes)
+        address = cluster_nodes
+        create = lambda: aioredis_cluster.create_redis_cluster(list(cluster_nodes), password=password,
+                                                               encoding=encoding, connect_timeout=timeout,
+                                                               pool_minsize=minsize, pool_maxsize=maxsize)
+    else:
+        address = (host, port)
+        create = lambda: aioredis.create_redis_pool((host, port), **kwargs)
+
+    if not shared:
+        return await create()
+
+    loop = asyncio.get_event_loop()
+    key = (address, db, password, encoding, loop)
+    future = _pools.get(key)
+    if future is None or (future.done() and not _is_usable(future)):
+        # concurrent callers wait for the same pool
+        future = _pools[key] = asyncio.ensure_future(create())
+        _pool_sizes[key] = (minsize, maxsize)
+        logging.info("create redis pool %s db: %s, minsize: %d, maxsize: %d" %
+                     (str(address), str(db), minsize, maxsize))
+    elif _pool_sizes[key] != (minsize, maxsize):
+        logging.warning("shared redis pool %s db: %s already created with minsize: %d, maxsize: %d, "
+                        "requested minsize: %d, maxsize: %d is ignored, pass share_pool=False to create a "
+                        "separate pool" % ((str(address), str(db)) + _pool_sizes[key] + (minsize, maxsize)))
+    return await asyncio.shield(future)
+
+
+async def get_node_client(cli, key):
+    """
+    pipeline, transaction and lua script can only operate keys of one node in redis cluster
+    :return: client of the node owns key in redis cluster, cli itself if not cluster
+    """
+    if "aioredis_cluster" in globals() and isinstance(cli, aioredis_cluster.RedisCluster):
+        return await cli.keys_master(key)
+    return cli
+
+
+def shard_keys(key, shards):
+    """
+    :return: physical keys of a logical key, key:{0} ... key:{shards-1}, the part in braces is the hash tag,
+             so that shards are spread over different slots of redis cluster
+    """
+    if not shards:
+        return [key]
+    return ["%s:{%d}" % (key, i) for i in range(shards)]
+
+
+def shard_of(field, shards):
+    """
+    :return: index of shard a HASH field belongs to
+    """
+    return zlib.crc32(str(field).encode("utf8")) % shards
+
+
+def _is_usable(future):
+    """
+    :param future: a done future of redis pool
+    """
+    return not future.cancelled() and future.exception() is None and not future.result().closed
+
+
+async def close_redis_pools():
+    """
+    close all shared pools
+    """
+    futures = list(_pools.values())
+    _pools.clear()
+    _pool_sizes.clear()
+    for future in futures:
+        if future.done() and _is_usable(future):
+            pool = future.result()
+            pool.close()
+            await pool.wait_closed()
+
+
+redis_codecs = ("zlib", "zstd", "lz4")
+# first byte of compressed value, zlib value has no header byte, it always starts with 0x78
+zstd_header = b"\x01"
+lz4_header = b"\x02"
+
+
+class RedisCodec(object):
+    def __init__(self, compress, encoding, level=None, zstd_dict=None, workers=None):
+        """
+        encode item to json string, compress it if compress is set, decode detect codec of each value,
+        so values compressed by different codecs can be read by the same getter
+
+        :param compress: False means no compression, True is the same as "zlib", or one of "zlib", "zstd", "lz4"
+        :param encoding: encoding of json string
+        :param level: compression level, None means default level of the codec
+        :param zstd_dict: zstd only, trained dictionary, bytes or path of dictionary file,
+                          values compressed with dictionary can only be decoded with the same dictionary
+        :param workers: if > 1, compress/decompress batch in a thread pool with workers threads
+        """
+        if compress is True:
+            compress = "zlib"
+        if compress and compress not in redis_codecs:
+            raise ValueError("compress must be a boolean or one of (%s)" % (str(redis_codecs), ))
+        if (compress == "zstd" or zstd_dict) and "zstandard" not in globals():
+            raise ValueError("zstd compress disabled, please install package zstandard to enable it")
+        if compress == "lz4" and "lz4" not in globals():
+            raise ValueError("lz4 compress disabled, please install package lz4 to enable it")
+
+        if isinstance(zstd_dict, str):
+            with open(zstd_dict, "rb") as f:
+                zstd_dict = f.read()
+        self.compress = compress
+        self.encoding = encoding
+        self.level = level
+        self.zstd_dict = zstandard.ZstdCompressionDict(zstd_dict) if zstd_dict else None
+        self.workers = workers
+        self.executor = None
+        # zstd compressor and decompressor can't be shared between threads
+        self.local = threading.local()
+
+    def zstd_compressor(self):
+        if not hasattr(self.local, "compressor"):
+            self.local.compressor = zstandard.ZstdCompressor(level=self.level if self.level is not None else 3,
+                                                             dict_data=self.zstd_dict)
+        return self.local.compressor
+
+    def zstd_decompressor(self):
+        if not hasattr(self.local, "decompressor"):
+            self.local.decompressor = zstandard.ZstdDecompressor(dict_data=self.zstd_dict)
+        return self.local.decompressor
+
+    def compress_bytes(self, data):
+        if self.compress == "zstd":
+            return zstd_header + self.zstd_compressor().compress(data)
+        elif self.compress == "lz4":
+            if self.level:
+                return lz4_header + lz4.block.compress(data, mode="high_compression", compression=self.level)
+            return lz4_header + lz4.block.compress(data)
+        return zlib.compress(data, self.level if self.level is not None else -1)
+
+    def decompress_bytes(self, data):
+        header = data[:1]
+        if header == zstd_header:
+            if "zstandard" not in globals():
+                raise ValueError("value compressed by zstd, please install package zstandard to decode it")
+            return self.zstd_decompressor().decompress(data[1:])
+        elif header == lz4_header:
+            if "lz4" not in globals():
+                raise ValueError("value compressed by lz4, please install package lz4 to decode it")
+            return lz4.block.decompress(data[1:])
+        return zlib.decompress(data)
+
+    def dumps(self, item):
+        string = json.dumps(item)
+        if self.compress:
+            return self.compress_bytes(string.encode(self.encoding))
+        return string
+
+    def loads(self, value):
+        if self.compress:
+            value = self.decompress_bytes(value).decode(self.encoding)
+        return json.loads(value)
+
+    async def dumps_batch(self, items):
+        """
+        :return: list of encoded items
+        """
+        return await self.run_batch(self.dumps, items)
+
+    async def loads_batch(self, values):
+        """
+        :return: list of decoded items
+        """
+        return await self.run_batch(self.loads, values)
+
+    async def run_batch(self, func, values):
+        if not self.compress or not self.workers or self.workers <= 1 or len(values) < self.workers * 2:
+            return [func(value) for value in values]
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_event_loop()
+        # compression release the GIL, each thread handle a slice
+        size = (len(values) + self.workers - 1) // self.workers
+        results = await asyncio.gather(*[loop.run_in_executor(self.executor, self.run_slice, func,
+                                                              values[i:i + size])
+                                         for i in range(0, len(values), size)])
+        return [value for result in results for value in result]
+
+    @staticmethod
+    def run_slice(func, values):
+        return [func(value) for value in values]
+
+
+def train_zstd_dict(items, dict_size=112640, encoding="utf8"):
+    """
+    train a zstd dictionary from sample items, samples should be a few thousand items of the same shape as
+    items written later
+
+    :param items: list of dict
+    :param dict_size: max size of dictionary in bytes
+    :return: bytes of dictionary, save it to file and pass the path as zstd_dict
+    """
+    if "zstandard" not in globals():
+        raise ValueError("zstd compress disabled, please install package zstandard to enable it")
+    samples = [json.dumps(item).encode(encoding) for item in items]
+    return zstandard.train_dictionary(dict_size, samples).as_bytes()
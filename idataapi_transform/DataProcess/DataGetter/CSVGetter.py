@@ -1,56 +1,163 @@
+import io
+import os
 import csv
 import sys
+import asyncio
 import logging
+import collections
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from .BaseGetter import BaseGetter
+from ..Config.ConfigUtil.AsyncHelper import BackgroundReader
+from ..Config.FileConfig import open_file, get_compression
 
 if sys.platform == "linux":
     csv.field_size_limit(sys.maxsize)
 
+scan_block_size = 1024 * 1024
+
+
+def find_record_end(f, pos, odd):
+    """
+    :param pos: offset to start searching
+    :param odd: whether number of quote character before pos is odd, newline is inside a quoted field if odd
+    :return: offset just after the first newline ending a record, or end of file
+    """
+    f.seek(pos, 0)
+    while True:
+        block = f.read(scan_block_size)
+        if not block:
+            return pos
+        i = 0
+        while True:
+            j = block.find(b"\n", i)
+            if j < 0:
+                odd ^= block.count(b'"', i) & 1
+                break
+            odd ^= block.count(b'"', i, j) & 1
+            if not odd:
+                return pos + j + 1
+            i = j + 1
+        pos += len(block)
+
+
+def split_csv_ranges(filename, encoding, chunk_size):
+    """
+    split csv file into byte ranges aligned on record boundaries, newline inside quoted field is not a boundary
+    :return: headers, [(start, end), ...]
+    """
+    ranges = list()
+    with open(filename, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        header_end = find_record_end(f, 0, 0)
+        f.seek(0, 0)
+        headers = next(csv.reader(io.StringIO(f.read(header_end).decode(encoding), newline="")), list())
+        start = header_end
+        while start < size:
+            target = start + chunk_size
+            if target >= size:
+                ranges.append((start, size))
+                break
+            f.seek(start, 0)
+            odd = 0
+            remain = target - start
+            while remain > 0:
+                block = f.read(min(remain, scan_block_size))
+                odd ^= block.count(b'"') & 1
+                remain -= len(block)
+            end = find_record_end(f, target, odd)
+            ranges.append((start, end))
+            start = end
+    return headers, ranges
+
+
+def parse_csv_range(filename, encoding, headers, start, end):
+    """
+    run in worker process
+    :return: list of dict
+    """
+    with open(filename, "rb") as f:
+        f.seek(start, 0)
+        text = f.read(end - start).decode(encoding)
+    return list(csv.DictReader(io.StringIO(text, newline=""), fieldnames=headers))
+
 
 class CSVGetter(BaseGetter):
     def __init__(self, config):
         super().__init__()
         self.config = config
-        self.f_in = open(self.config.filename, self.config.mode, encoding=self.config.encoding)
+        self.compression = get_compression(self.config.filename, self.config.compression)
+        self.f_in = open_file(self.config.filename, self.config.mode, encoding=self.config.encoding,
+                              compression=self.compression or "none")
         self.reader = csv.DictReader(self.f_in)
+        # compressed file can't be split by byte offset
+        self.parallel = bool(self.config.workers and self.config.workers > 1 and not self.compression)
 
         self.done = False
         self.responses = list()
         self.miss_count = 0
         self.total_count = 0
 
+        self.executor = None
+        self.headers = None
+        self.ranges = None
+        self.futures = None
+
+        self.background = None
+        self.rows_iter = iter(()) if self.config.read_in_thread else self.reader
+
     def init_val(self):
         self.done = False
         self.responses = list()
-        self.f_in.seek(0, 0)
+        if self.compression:
+            # compressed stream can't seek back
+            self.f_in.close()
+            self.f_in = open_file(self.config.filename, self.config.mode, encoding=self.config.encoding,
+                                  compression=self.compression)
+            self.reader = csv.DictReader(self.f_in)
+        else:
+            self.f_in.seek(0, 0)
         self.miss_count = 0
         self.total_count = 0
+        self.free_executor()
+        if self.background is not None:
+            self.background.close()
+            self.background = None
+        self.rows_iter = iter(()) if self.config.read_in_thread else self.reader
 
     def __aiter__(self):
         return self
 
     async def __anext__(self):
+        if self.parallel:
+            return await self.parallel_anext()
+
         if self.done:
             logging.info("get source done: %s, total get %d items, total filtered: %d items" %
                          (self.config.filename, self.total_count, self.miss_count))
             self.init_val()
             raise StopAsyncIteration
 
-        for row in self.reader:
-            if self.config.max_limit and self.total_count > self.config.max_limit:
-                self.done = True
-                return self.clear_and_return()
+        while True:
+            for row in self.rows_iter:
+                if self.config.max_limit and self.total_count >= self.config.max_limit:
+                    self.done = True
+                    return self.clear_and_return()
 
-            self.total_count += 1
-            if self.config.filter:
-                row = self.config.filter(row)
-            if not row:
-                self.miss_count += 1
-                continue
+                self.total_count += 1
+                if self.config.filter:
+                    row = self.config.filter(row)
+                if not row:
+                    self.miss_count += 1
+                    continue
 
-            self.responses.append(row)
-            if len(self.responses) > self.config.per_limit:
-                return self.clear_and_return()
+                self.responses.append(row)
+                if len(self.responses) > self.config.per_limit:
+                    return self.clear_and_return()
+
+            rows = await self.next_rows()
+            if rows is None:
+                break
+            self.rows_iter = iter(rows)
 
         if self.responses:
             self.done = True
@@ -62,8 +169,12 @@ class CSVGetter(BaseGetter):
         raise StopAsyncIteration
 
     def __iter__(self):
+        if self.parallel:
+            yield from self.parallel_iter()
+            return
+
         for row in self.reader:
-            if self.config.max_limit and self.total_count > self.config.max_limit:
+            if self.config.max_limit and self.total_count >= self.config.max_limit:
                 self.done = True
                 yield self.clear_and_return()
                 break
@@ -86,6 +197,121 @@ class CSVGetter(BaseGetter):
                      (self.config.filename, self.total_count, self.miss_count))
         self.init_val()
 
+    async def next_rows(self):
+        """
+        :return: next batch of rows read by background thread, None if no more rows
+        """
+        if not self.config.read_in_thread:
+            return None
+        if self.background is None:
+            self.background = BackgroundReader(self.read_rows, self.config.per_limit)
+        return await self.background.get()
+
+    def read_rows(self):
+        """
+        run in background thread, with its own file object
+        """
+        with open_file(self.config.filename, self.config.mode, encoding=self.config.encoding,
+                       compression=self.compression or "none") as f_in:
+            yield from csv.DictReader(f_in)
+
+    async def parallel_anext(self):
+        loop = asyncio.get_event_loop()
+        if self.executor is None and not self.done:
+            # scan file in thread, keep event loop free
+            self.headers, ranges = await loop.run_in_executor(None, split_csv_ranges, self.config.filename,
+                                                              self.config.encoding, self.config.chunk_size)
+            self.ranges = collections.deque(ranges)
+            self.futures = collections.deque()
+            self.executor = ProcessPoolExecutor(max_workers=self.config.workers)
+
+        while not self.done and len(self.responses) < self.config.per_limit:
+            # at most 2 chunks per worker in flight
+            while self.ranges and len(self.futures) < self.config.workers * 2:
+                start, end = self.ranges.popleft()
+                self.futures.append(loop.run_in_executor(self.executor, parse_csv_range, self.config.filename,
+                                                         self.config.encoding, self.headers, start, end))
+            if not self.futures:
+                self.done = True
+                break
+            if self.config.ordered:
+                rows = await self.futures.popleft()
+            else:
+                done, _ = await asyncio.wait(self.futures, return_when=asyncio.FIRST_COMPLETED)
+                future = done.pop()
+                self.futures.remove(future)
+                rows = future.result()
+            self.add_rows(rows)
+
+        if self.responses:
+            return self.clear_and_return_per_limit()
+
+        logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                     (self.config.filename, self.total_count, self.miss_count))
+        self.init_val()
+        raise StopAsyncIteration
+
+    def parallel_iter(self):
+        self.headers, ranges = split_csv_ranges(self.config.filename, self.config.encoding, self.config.chunk_size)
+        self.ranges = collections.deque(ranges)
+        self.futures = collections.deque()
+        self.executor = ProcessPoolExecutor(max_workers=self.config.workers)
+
+        while True:
+            # at most 2 chunks per worker in flight
+            while self.ranges and len(self.futures) < self.config.workers * 2:
+                start, end = self.ranges.popleft()
+                self.futures.append(self.executor.submit(parse_csv_range, self.config.filename,
+                                                         self.config.encoding, self.headers, start, end))
+            if not self.futures:
+                break
+            if self.config.ordered:
+                rows = self.futures.popleft().result()
+            else:
+                done, _ = wait(self.futures, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                self.futures.remove(future)
+                rows = future.result()
+            self.add_rows(rows)
+            while len(self.responses) >= self.config.per_limit:
+                yield self.clear_and_return_per_limit()
+            if self.done:
+                break
+
+        if self.responses:
+            yield self.clear_and_return()
+
+        logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                     (self.config.filename, self.total_count, self.miss_count))
+        self.init_val()
+
+    def add_rows(self, rows):
+        for row in rows:
+            if self.config.max_limit and self.total_count >= self.config.max_limit:
+                self.done = True
+                break
+
+            self.total_count += 1
+            if self.config.filter:
+                row = self.config.filter(row)
+            if not row:
+                self.miss_count += 1
+                continue
+            self.responses.append(row)
+
+    def free_executor(self):
+        if self.executor is not None:
+            if self.futures:
+                for future in self.futures:
+                    future.cancel()
+            self.executor.shutdown(wait=False)
+            self.executor = self.ranges = self.futures = None
+
+    def clear_and_return_per_limit(self):
+        resp = self.responses[:self.config.per_limit]
+        self.responses = self.responses[self.config.per_limit:]
+        return resp
+
     def clear_and_return(self):
         resp = self.responses
         self.responses = list()
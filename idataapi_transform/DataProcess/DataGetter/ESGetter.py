@@ -3,6 +3,7 @@ import random
 import logging
 import traceback
 from .BaseGetter import BaseGetter
+from ..Config.DefaultValue import DefaultVal
 
 
 class ESScrollGetter(BaseGetter):
@@ -93,18 +94,45 @@ class ESScrollGetter(BaseGetter):
         self.init_val()
         raise StopAsyncIteration
 
-    async def delete_all(self):
+    async def delete_all(self, slices=DefaultVal.es_slices, requests_per_second=DefaultVal.es_requests_per_second,
+                         poll_interval=DefaultVal.es_task_poll_interval):
         """
-        inefficient delete
+        delete every document of indices->doc_type in background, poll tasks API until it finished
+        :param slices: number of slices to parallelize the delete, "auto" means one slice per shard
+        :param requests_per_second: throttle, None means no throttle
+        :param poll_interval: seconds between each poll of the task status
         """
         body = {
             "query": {
                 "match_all": {}
             }
         }
-        result = await self.config.es_client.delete_by_query(index=self.config.indices, doc_type=self.config.doc_type,
-                                                             body=body, params={"conflicts": "proceed"})
-        return result
+        return await self.config.es_client.perform_task("delete_by_query", self.config.indices, body,
+                                                        doc_type=self.config.doc_type, conflicts="proceed",
+                                                        slices=slices, requests_per_second=requests_per_second,
+                                                        poll_interval=poll_interval,
+                                                        name=self.config.indices + "->" + self.config.doc_type)
+
+    async def reindex_to(self, dest_indices, dest_doc_type=None, slices=DefaultVal.es_slices,
+                         requests_per_second=DefaultVal.es_requests_per_second,
+                         poll_interval=DefaultVal.es_task_poll_interval):
+        """
+        reindex every document matched by query_body to dest_indices in background, poll tasks API until it finished
+        :param dest_indices: indices to copy to
+        :param dest_doc_type: doc_type of dest, default same as source
+        """
+        source = {"index": self.config.indices, "type": self.config.doc_type}
+        if "query" in self.config.query_body:
+            source["query"] = self.config.query_body["query"]
+        body = {
+            "conflicts": "proceed",
+            "source": source,
+            "dest": {"index": dest_indices, "type": dest_doc_type if dest_doc_type else self.config.doc_type}
+        }
+        return await self.config.es_client.perform_task("reindex", body, slices=slices,
+                                                        requests_per_second=requests_per_second,
+                                                        poll_interval=poll_interval,
+                                                        name=self.config.indices + "->" + dest_indices)
 
     def __iter__(self):
         raise ValueError("ESGetter must be used with async generator, not normal generator")
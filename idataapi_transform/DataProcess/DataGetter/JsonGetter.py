@@ -1,6 +1,13 @@
+import os
+import sys
 import json
+import mmap
 import logging
+import itertools
 from .BaseGetter import BaseGetter
+from ..Config.LineOffsetIndex import LineOffsetIndex
+from ..Config.ConfigUtil.AsyncHelper import BackgroundReader
+from ..Config.FileConfig import open_file, get_compression
 
 
 class JsonGetter(BaseGetter):
@@ -9,16 +16,97 @@ class JsonGetter(BaseGetter):
         self.config = config
         self.responses = list()
         self.done = False
-        self.f_in = open(self.config.filename, self.config.mode, encoding=self.config.encoding)
+        self.compression = get_compression(self.config.filename, self.config.compression)
+        self.f_in = open_file(self.config.filename, self.config.mode, encoding=self.config.encoding,
+                              compression=self.compression or "none")
         self.miss_count = 0
         self.total_count = 0
+        self.background = None
+
+        self.index = None
+        self.start_line = 0
+        self.start_offset = 0
+        self.line_count = None
+        self.init_range()
+        # json.loads accept utf8 bytes since python3.6
+        self.need_decode = self.config.encoding.lower() not in ("utf8", "utf-8") or sys.version_info < (3, 6)
+        self.lines_iter = iter(()) if self.config.read_in_thread else self.lines()
+
+    def init_range(self):
+        """
+        byte offset to start reading, and how many lines to read, None means until the end of file
+        """
+        if self.config.use_index:
+            self.index = LineOffsetIndex(self.config.filename, self.config.index_filename)
+            if self.config.start_offset:
+                self.start_line = self.index.line_of(self.config.start_offset)
+            else:
+                self.start_line = self.config.start_line or 0
+            end_line = len(self.index) if self.config.end_line is None else min(self.config.end_line, len(self.index))
+            self.start_offset = self.index.offset(self.start_line)
+            self.line_count = max(end_line - self.start_line, 0)
+        elif self.config.start_offset:
+            # line number unknown without index
+            self.start_line = None
+            self.start_offset = self.config.start_offset
+
+    def open_lines(self, f_in):
+        """
+        seek f_in to start_offset, return an iterator of lines in range
+        """
+        if self.start_offset:
+            f_in.seek(self.start_offset, 0)
+        if self.line_count is None:
+            return f_in
+        return itertools.islice(f_in, self.line_count)
+
+    def mmap_lines(self):
+        """
+        memory map the file, split lines on bytes, decode only if json can't load the bytes directly
+        """
+        with open(self.config.filename, "rb") as f_in:
+            if os.fstat(f_in.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mm.seek(self.start_offset)
+                lines = iter(mm.readline, b"")
+                if self.line_count is not None:
+                    lines = itertools.islice(lines, self.line_count)
+                if self.need_decode:
+                    encoding = self.config.encoding
+                    lines = (line.decode(encoding) for line in lines)
+                yield from lines
+
+    def lines(self):
+        if self.config.use_mmap:
+            return self.mmap_lines()
+        return self.open_lines(self.f_in)
+
+    def checkpoint(self):
+        """
+        :return: line number of the next line to read, pass it as start_line of RJsonConfig to resume,
+                 None if start from start_offset without index
+        """
+        if self.start_line is None:
+            return None
+        return self.start_line + self.total_count
 
     def init_val(self):
         self.responses = list()
         self.done = False
-        self.f_in.seek(0, 0)
+        if self.compression:
+            # compressed stream can't seek back
+            self.f_in.close()
+            self.f_in = open_file(self.config.filename, self.config.mode, encoding=self.config.encoding,
+                                  compression=self.compression)
+        else:
+            self.f_in.seek(0, 0)
         self.miss_count = 0
         self.total_count = 0
+        if self.background is not None:
+            self.background.close()
+            self.background = None
+        self.lines_iter = iter(()) if self.config.read_in_thread else self.lines()
 
     def __aiter__(self):
         return self
@@ -30,28 +118,34 @@ class JsonGetter(BaseGetter):
             self.init_val()
             raise StopAsyncIteration
 
-        for line in self.f_in:
-            if self.config.max_limit and self.total_count > self.config.max_limit:
-                self.done = True
-                return self.clear_and_return()
+        while True:
+            for line in self.lines_iter:
+                if self.config.max_limit and self.total_count >= self.config.max_limit:
+                    self.done = True
+                    return self.clear_and_return()
+
+                self.total_count += 1
+                try:
+                    json_obj = json.loads(line)
+                except (json.decoder.JSONDecodeError, UnicodeDecodeError):
+                    logging.error("JSONDecodeError. give up. line: %d" % (self.total_count, ))
+                    continue
 
-            self.total_count += 1
-            try:
-                json_obj = json.loads(line)
-            except json.decoder.JSONDecodeError:
-                logging.error("JSONDecodeError. give up. line: %d" % (self.total_count, ))
-                continue
+                if self.config.filter:
+                    json_obj = self.config.filter(json_obj)
+                    if not json_obj:
+                        self.miss_count += 1
+                        continue
 
-            if self.config.filter:
-                json_obj = self.config.filter(json_obj)
-                if not json_obj:
-                    self.miss_count += 1
-                    continue
+                self.responses.append(json_obj)
 
-            self.responses.append(json_obj)
+                if len(self.responses) > self.config.per_limit:
+                    return self.clear_and_return()
 
-            if len(self.responses) > self.config.per_limit:
-                return self.clear_and_return()
+            lines = await self.next_lines()
+            if lines is None:
+                break
+            self.lines_iter = iter(lines)
 
         self.done = True
         if self.responses:
@@ -62,9 +156,30 @@ class JsonGetter(BaseGetter):
         self.init_val()
         raise StopAsyncIteration
 
+    async def next_lines(self):
+        """
+        :return: next batch of lines read by background thread, None if no more lines
+        """
+        if not self.config.read_in_thread:
+            return None
+        if self.background is None:
+            self.background = BackgroundReader(self.read_lines, self.config.per_limit)
+        return await self.background.get()
+
+    def read_lines(self):
+        """
+        run in background thread, with its own file object
+        """
+        if self.config.use_mmap:
+            yield from self.mmap_lines()
+            return
+        with open_file(self.config.filename, self.config.mode, encoding=self.config.encoding,
+                       compression=self.compression or "none") as f_in:
+            yield from self.open_lines(f_in)
+
     def __iter__(self):
-        for line in self.f_in:
-            if self.config.max_limit and self.total_count > self.config.max_limit:
+        for line in self.lines():
+            if self.config.max_limit and self.total_count >= self.config.max_limit:
                 self.done = True
                 yield self.clear_and_return()
                 break
@@ -72,7 +187,7 @@ class JsonGetter(BaseGetter):
             self.total_count += 1
             try:
                 json_obj = json.loads(line)
-            except json.decoder.JSONDecodeError:
+            except (json.decoder.JSONDecodeError, UnicodeDecodeError):
                 logging.error("JSONDecodeError. give up. line: %d" % (self.total_count, ))
                 continue
 
@@ -96,6 +211,8 @@ class JsonGetter(BaseGetter):
 
     def __del__(self):
         self.f_in.close()
+        if self.index is not None:
+            self.index.close()
 
     def clear_and_return(self):
         resp = self.responses
@@ -17,6 +17,13 @@ class MySQLGetter(BaseGetter):
         self.key_fields = list()
         self.key_fields_map = dict()
         self.need_finish = False
+        # keyset pagination, value of keyset_field in last row read
+        self.keyset_index = None
+        self.last_key = None
+        self.stream_cursor = None
+        # whether all rows of stream query are read, whether gave up after retry
+        self.stream_exhausted = False
+        self.give_up = False
 
     def init_val(self):
         self.responses = list()
@@ -26,6 +33,12 @@ class MySQLGetter(BaseGetter):
         self.key_fields = list()
         self.key_fields_map = dict()
         self.need_finish = False
+        self.keyset_index = None
+        self.last_key = None
+        self.stream_cursor = None
+        # whether all rows of stream query are read, whether gave up after retry
+        self.stream_exhausted = False
+        self.give_up = False
 
     def __aiter__(self):
         return self
@@ -33,15 +46,18 @@ class MySQLGetter(BaseGetter):
     async def __anext__(self):
         await self.config.get_mysql_pool_cli()  # init mysql pool
 
-        if self.need_finish:
-            await self.finish()
-
-        if self.total_size is None:
+        if not self.key_fields:
             self.total_size, self.key_fields = await self.get_total_size_and_key_field()
+            if self.config.keyset_field:
+                if self.config.keyset_field not in self.key_fields:
+                    raise ValueError("keyset_field %s not in columns of table %s" %
+                                     (self.config.keyset_field, self.config.table))
+                self.keyset_index = self.key_fields.index(self.config.keyset_field)
 
-        if self.total_count < self.total_size:
+        while not self.need_finish and (self.total_size is None or self.total_count < self.total_size):
             await self.fetch_per_limit()
-            return self.clear_and_return()
+            if self.responses:
+                return self.clear_and_return()
 
         # reach here, means done
         await self.finish()
@@ -52,41 +68,88 @@ class MySQLGetter(BaseGetter):
     async def finish(self):
         logging.info("get source done: %s, total get %d items, total filtered: %d items" %
                      (self.config.name, self.total_count, self.miss_count))
+        if self.stream_cursor is not None:
+            if not self.stream_exhausted and not self.give_up:
+                # stopped by total size, stream may end right here
+                try:
+                    self.stream_exhausted = await self.stream_cursor.fetchone() is None
+                except Exception as e:
+                    pass
+            if self.stream_exhausted:
+                await self.stream_cursor.close()
+            elif self.config.connection is not None:
+                # stream abandoned(error or limit), rows not read yet are discarded with the connection
+                # instead of read through
+                self.config.connection.close()
         self.init_val()
         self.config.free_resource()
         raise StopAsyncIteration
 
     async def get_total_size_and_key_field(self):
-        await self.config.cursor.execute("DESC %s" % (self.config.table, ))
-        result = await self.config.cursor.fetchall()
-        field = result[0][0]
-        await self.config.cursor.execute("select count(%s) from %s" % (field, self.config.table))
-        result = await self.config.cursor.fetchone()
-        # key field
+        """
+        :return: (number of rows to read, None if unknown), column names
+        """
         await self.config.cursor.execute("DESC %s" % (self.config.table, ))
         results = await self.config.cursor.fetchall()
-        key_fields = list()
         for each in results:
-            key_fields.append(each[0])
             if "tinyint" in each[1]:
                 self.key_fields_map[each[0]] = bool
             elif "text" in each[1]:
                 self.key_fields_map[each[0]] = str  # or json
-
         key_fields = list(i[0] for i in results)
-        return result[0], key_fields
+
+        total_size = self.config.max_limit or None
+        if self.config.count:
+            await self.config.cursor.execute("SELECT COUNT(*) FROM %s" % (self.config.table, ))
+            result = await self.config.cursor.fetchone()
+            total_size = min(result[0], total_size) if total_size else result[0]
+        return total_size, key_fields
+
+    def build_query(self, limit):
+        """
+        :return: sql, args
+        """
+        if self.config.keyset_field:
+            sql = "SELECT * FROM %s" % (self.config.table, )
+            args = None
+            if self.last_key is not None:
+                sql += " WHERE `%s` > %%s" % (self.config.keyset_field, )
+                args = (self.last_key, )
+            sql += " ORDER BY `%s`" % (self.config.keyset_field, )
+            if limit is not None:
+                sql += " LIMIT %d" % (limit, )
+            return sql, args
+        if limit is None:
+            return "SELECT * FROM %s" % (self.config.table, ), None
+        return "SELECT * FROM %s LIMIT %d,%d" % (self.config.table, self.total_count, limit), None
+
+    async def fetch_rows(self, limit):
+        if not self.config.stream:
+            sql, args = self.build_query(limit)
+            await self.config.cursor.execute(sql, args)
+            return await self.config.cursor.fetchall()
+
+        if self.stream_cursor is None:
+            sql, args = self.build_query(None)
+            self.stream_cursor = await self.config.get_stream_cursor()
+            await self.stream_cursor.execute(sql, args)
+        return await self.stream_cursor.fetchmany(limit)
 
     async def fetch_per_limit(self):
         results = list()
         try_time = 0
+        limit = self.config.per_limit
+        if self.total_size is not None:
+            limit = min(limit, self.total_size - self.total_count)
         while try_time < self.config.max_retry:
             try:
-                await self.config.cursor.execute("SELECT * FROM %s LIMIT %d,%d" %
-                                                 (self.config.table, self.total_count, self.config.per_limit))
-                results = await self.config.cursor.fetchall()
+                results = await self.fetch_rows(limit)
                 break
             except Exception as e:
                 try_time += 1
+                if self.stream_cursor is not None:
+                    # position of stream can't be restored
+                    try_time = self.config.max_retry
                 if try_time < self.config.max_retry:
                     logging.error("retry: %d, %s" % (try_time, str(e)))
                     await asyncio.sleep(random.uniform(self.config.random_min_sleep, self.config.random_max_sleep))
@@ -95,13 +158,15 @@ class MySQLGetter(BaseGetter):
                                   "total get %d items, total filtered: %d items, reason: %s" %
                                   (self.config.name, self.config.max_retry, self.total_count, self.miss_count,
                                    str(traceback.format_exc())))
-                    self.need_finish = True
+                    self.need_finish = self.give_up = True
 
+        if results and self.keyset_index is not None:
+            self.last_key = results[-1][self.keyset_index]
         self.responses = [self.decode(i) for i in results]
         curr_miss_count = 0
         if self.config.filter:
             target_results = list()
-            for each in results:
+            for each in self.responses:
                 each = self.config.filter(each)
                 if each:
                     target_results.append(each)
@@ -114,7 +179,11 @@ class MySQLGetter(BaseGetter):
         logging.info("Get %d items from %s, filtered: %d items, percentage: %.2f%%" %
                      (len(results), self.config.name, curr_miss_count,
                       (self.total_count / self.total_size * 100) if self.total_size else 0))
-        if self.total_count >= self.total_size:
+        if len(results) < limit and not self.need_finish:
+            # a short page without error means no more rows
+            self.stream_exhausted = self.stream_cursor is not None
+            self.need_finish = True
+        elif self.total_size is not None and self.total_count >= self.total_size:
             self.need_finish = True
         return
 
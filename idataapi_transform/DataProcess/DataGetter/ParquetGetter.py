@@ -0,0 +1,95 @@
+import logging
+import itertools
+from .BaseGetter import BaseGetter
+
+try:
+    import pyarrow.parquet
+except Exception as e:
+    pass
+
+
+class ParquetGetter(BaseGetter):
+    def __init__(self, config):
+        super().__init__(self)
+        self.config = config
+        self.parquet_file = pyarrow.parquet.ParquetFile(self.config.filename)
+        self.responses = list()
+        self.done = False
+        self.miss_count = 0
+        self.total_count = 0
+        self.row_iter = itertools.chain.from_iterable(self.batches())
+
+    def init_val(self):
+        self.responses = list()
+        self.done = False
+        self.miss_count = 0
+        self.total_count = 0
+        self.row_iter = itertools.chain.from_iterable(self.batches())
+
+    def batches(self):
+        """
+        decode one record batch at a time, each batch converted to list of dict
+        """
+        for batch in self.parquet_file.iter_batches(batch_size=self.config.per_limit, columns=self.config.columns):
+            columns = batch.to_pydict()
+            keys = list(columns.keys())
+            yield [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.done:
+            logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                         (self.config.filename, self.total_count, self.miss_count))
+            self.init_val()
+            raise StopAsyncIteration
+
+        for row in self.row_iter:
+            if self.add_row(row):
+                return self.clear_and_return()
+            if self.done:
+                break
+
+        self.done = True
+        if self.responses:
+            return self.clear_and_return()
+
+        logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                     (self.config.filename, self.total_count, self.miss_count))
+        self.init_val()
+        raise StopAsyncIteration
+
+    def add_row(self, row):
+        """
+        :return: True if responses is full
+        """
+        self.total_count += 1
+        if self.config.max_limit and self.total_count >= self.config.max_limit:
+            self.done = True
+        if self.config.filter:
+            row = self.config.filter(row)
+            if not row:
+                self.miss_count += 1
+                return False
+        self.responses.append(row)
+        return len(self.responses) >= self.config.per_limit
+
+    def __iter__(self):
+        for row in self.row_iter:
+            if self.add_row(row):
+                yield self.clear_and_return()
+            if self.done:
+                break
+
+        if self.responses:
+            yield self.clear_and_return()
+
+        logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                     (self.config.filename, self.total_count, self.miss_count))
+        self.init_val()
+
+    def clear_and_return(self):
+        resp = self.responses
+        self.responses = list()
+        return resp
@@ -1,10 +1,26 @@
+import copy
 import asyncio
 import random
 import logging
 import traceback
-import json
-import zlib
+import aioredis
+from aioredis.commands.streams import fields_to_dict
 from .BaseGetter import BaseGetter
+from ..Config.RedisConfig import get_node_client
+
+# remove at most ARGV[1] items from the left(ARGV[2] is "L") or right of list KEYS[1] atomically, return them
+pop_script = """
+local n = tonumber(ARGV[1])
+local items
+if ARGV[2] == "L" then
+    items = redis.call("LRANGE", KEYS[1], 0, n - 1)
+    redis.call("LTRIM", KEYS[1], n, -1)
+else
+    items = redis.call("LRANGE", KEYS[1], -n, -1)
+    redis.call("LTRIM", KEYS[1], 0, -n - 1)
+end
+return items
+"""
 
 
 class RedisGetter(BaseGetter):
@@ -19,6 +35,20 @@ class RedisGetter(BaseGetter):
         self.miss_count = 0
         self.total_count = 0
         self.redis_object_length = 0
+        # STREAM, "0" means read entries delivered to this consumer but not acknowledged, then ">" for new entries
+        self.latest_id = "0"
+        self.ack_ids = list()
+        self.group_created = False
+        # HASH, cursor of next HSCAN page, future of the page being fetched, values not returned yet
+        self.hash_cursor = 0
+        self.hash_future = None
+        self.hash_values = list()
+        self.hash_scan_done = False
+        # sharded key, getter of each shard ==> its read budget, future of reading shard ==> getter,
+        # batches read but not returned
+        self.shard_getters = None
+        self.shard_futures = None
+        self.shard_batches = list()
 
     def init_val(self):
         self.responses = list()
@@ -27,18 +57,31 @@ class RedisGetter(BaseGetter):
         self.total_count = 0
         self.redis_object_length = 0
         self.total_size = None
+        self.latest_id = "0"
+        self.ack_ids = list()
+        self.cancel_hash_scan()
+        self.hash_cursor = 0
+        self.hash_values = list()
+        self.hash_scan_done = False
+        self.cancel_shards()
 
     def decode(self, loaded_object):
-        if self.config.compress:
-            return zlib.decompress(loaded_object).decode(self.config.encoding)
-        else:
-            return json.loads(loaded_object)
+        return self.config.codec.loads(loaded_object)
 
     def __aiter__(self):
         return self
 
     async def __anext__(self, retry=1):
         await self.config.get_redis_pool_cli()  # init redis pool
+        if len(self.config.keys) > 1:
+            return await self.shard_anext()
+        if self.config.key_type == "STREAM":
+            return await self.stream_anext()
+        if self.config.pop:
+            return await self.pop_anext()
+        if self.config.key_type == "HASH":
+            return await self.hash_anext()
+
         if self.is_range and self.total_size is None:
             self.redis_object_length = await self.config.redis_len_method(self.config.key)
             self.total_size = self.config.max_limit if (self.config.max_limit and self.config.max_limit < self.redis_object_length) else self.redis_object_length
@@ -61,7 +104,7 @@ class RedisGetter(BaseGetter):
 
             try:
                 self.responses = await self.config.redis_read_method(self.config.key, left, right)
-                self.responses = [self.decode(i) for i in self.responses]
+                self.responses = await self.config.codec.loads_batch(self.responses)
             except Exception as e:
                 if retry < self.config.max_retry:
                     logging.error("retry: %d, %s" % (retry, str(e)))
@@ -76,36 +119,24 @@ class RedisGetter(BaseGetter):
                 self.done = True
                 if self.need_del:
                     await self.config.redis_del_method(self.config.key, 0, -1)
-        else:
-
-            try:
-                self.responses = await self.config.redis_read_method(self.config.key)
-                self.responses = [self.decode(i) for i in self.responses.values()][:self.total_size]
-            except Exception as e:
-                if retry < self.config.max_retry:
-                    logging.error("retry: %d, %s" % (retry, str(e)))
-                    await asyncio.sleep(random.uniform(self.config.random_min_sleep, self.config.random_max_sleep))
-                    return await self.__anext__(retry+1)
-                else:
-                    logging.error("Give up redis getter, After retry: %d times, still fail to get key: %s, "
-                                  "total get %d items, total filtered: %d items, reason: %s" %
-                                  (self.config.max_retry, self.config.key, self.total_count, self.miss_count, str(traceback.format_exc())))
-                    raise StopAsyncIteration
-
-            if self.config.max_limit:
-                self.responses = self.responses[:self.config.max_limit]
-            self.done = True
-            if self.need_del:
-                await self.config.redis_del_method(self.config.key)
 
         current_response_length = len(self.responses)
+        curr_miss_count = self.filter_responses()
+        logging.info("Get %d items from %s, filtered: %d items, percentage: %.2f%%" %
+                     (current_response_length, self.config.name, curr_miss_count,
+                      (self.total_count / self.total_size * 100) if self.total_size else 0))
+        return self.clear_and_return()
+
+    def filter_responses(self):
+        """
+        :return: number of items filtered
+        """
         curr_miss_count = 0
-        self.total_count += current_response_length
+        self.total_count += len(self.responses)
         if self.config.filter:
             target_responses = list()
             for i in self.responses:
-                if self.config.filter:
-                    i = self.config.filter(i)
+                i = self.config.filter(i)
                 if i:
                     target_responses.append(i)
                 else:
@@ -113,11 +144,289 @@ class RedisGetter(BaseGetter):
             self.responses = target_responses
 
         self.miss_count += curr_miss_count
-        if self.is_range:
-            logging.info("Get %d items from %s, filtered: %d items, percentage: %.2f%%" %
-                         (current_response_length, self.config.name, curr_miss_count,
-                          (self.total_count / self.total_size * 100) if self.total_size else 0))
-        return self.clear_and_return()
+        return curr_miss_count
+
+    async def shard_anext(self):
+        """
+        each shard is read by its own getter, all shards are read concurrently, return batch of shard finished first,
+        read budget of shards in flight never exceed max_limit, so no item is read(or popped) and then dropped
+        """
+        if self.shard_getters is None:
+            self.shard_getters = dict()
+            self.shard_futures = dict()
+            for key in self.config.keys:
+                config = copy.copy(self.config)
+                config.key = key
+                config.keys = [key]
+                config.name = "%s:%s" % (self.config.name, key)
+                # filter and max_limit are applied here
+                config.filter = None
+                config.max_limit = None
+                self.shard_getters[RedisGetter(config)] = 0
+
+        while True:
+            # shards idle start reading next batch before a batch is returned
+            for getter, budget in list(self.shard_getters.items()):
+                if budget:
+                    continue
+                budget = self.config.per_limit
+                if self.config.max_limit:
+                    read_count = self.total_count + sum(self.shard_getters.values()) + \
+                                 sum(len(batch) for batch in self.shard_batches)
+                    budget = min(budget, self.config.max_limit - read_count)
+                    if budget <= 0:
+                        break
+                getter.config.per_limit = budget
+                self.shard_getters[getter] = budget
+                self.shard_futures[asyncio.ensure_future(getter.__anext__())] = getter
+
+            while self.shard_batches:
+                self.responses = self.shard_batches.pop(0)
+                current_response_length = len(self.responses)
+                curr_miss_count = self.filter_responses()
+                logging.info("Get %d items from %s, filtered: %d items" %
+                             (current_response_length, self.config.name, curr_miss_count))
+                if self.responses:
+                    return self.clear_and_return()
+
+            if not self.shard_futures:
+                logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                             (self.config.name, self.total_count, self.miss_count))
+                self.init_val()
+                raise StopAsyncIteration
+
+            done, _ = await asyncio.wait(list(self.shard_futures), return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                getter = self.shard_futures.pop(future)
+                try:
+                    self.shard_batches.append(future.result())
+                    self.shard_getters[getter] = 0
+                except StopAsyncIteration:
+                    # shard finished
+                    del self.shard_getters[getter]
+
+    def cancel_shards(self):
+        if self.shard_futures:
+            for future in self.shard_futures:
+                future.cancel()
+        self.shard_getters = self.shard_futures = None
+        self.shard_batches = list()
+
+    async def pop_anext(self, retry=1):
+        """
+        remove a batch from list and return it, stop when list is empty
+        """
+        while not self.done:
+            count = self.config.per_limit
+            if self.config.max_limit:
+                count = min(count, self.config.max_limit - self.total_count)
+            try:
+                cli = await get_node_client(self.config.redis_pool_cli, self.config.key)
+                self.responses = await cli.eval(pop_script, keys=[self.config.key], args=[count, self.config.direction])
+            except Exception as e:
+                if retry < self.config.max_retry:
+                    logging.error("retry: %d, %s" % (retry, str(e)))
+                    await asyncio.sleep(random.uniform(self.config.random_min_sleep, self.config.random_max_sleep))
+                    return await self.pop_anext(retry + 1)
+                logging.error("Give up redis getter, After retry: %d times, still fail to get key: %s, "
+                              "total get %d items, total filtered: %d items, reason: %s" %
+                              (self.config.max_retry, self.config.key, self.total_count, self.miss_count,
+                               str(traceback.format_exc())))
+                break
+
+            if len(self.responses) < count or \
+                    (self.config.max_limit and self.total_count + len(self.responses) >= self.config.max_limit):
+                self.done = True
+            if self.config.direction != "L":
+                # right most first, same as RPOP
+                self.responses.reverse()
+            self.responses = await self.config.codec.loads_batch(self.responses)
+            current_response_length = len(self.responses)
+            curr_miss_count = self.filter_responses()
+            if current_response_length:
+                logging.info("Pop %d items from %s, filtered: %d items" %
+                             (current_response_length, self.config.name, curr_miss_count))
+            if self.responses:
+                return self.clear_and_return()
+
+        logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                     (self.config.name, self.total_count, self.miss_count))
+        self.init_val()
+        raise StopAsyncIteration
+
+    async def hash_anext(self):
+        """
+        read values of hash page by page with HSCAN, next page is fetched while current page is processed,
+        a field may be returned more than once if the hash is modified while reading
+        """
+        if self.total_size is None:
+            self.redis_object_length = await self.config.redis_len_method(self.config.key)
+            self.total_size = self.config.max_limit if (self.config.max_limit and self.config.max_limit < self.redis_object_length) else self.redis_object_length
+
+        while not self.done:
+            while len(self.hash_values) < self.config.per_limit and not self.hash_scan_done:
+                values = await self.next_hash_page()
+                if values is None:
+                    # give up
+                    self.hash_scan_done = True
+                    self.hash_values = list()
+                    break
+                self.hash_values.extend(values)
+
+            count = self.config.per_limit
+            if self.config.max_limit:
+                count = min(count, self.config.max_limit - self.total_count)
+            self.responses = await self.config.codec.loads_batch(self.hash_values[:count])
+            self.hash_values = self.hash_values[count:]
+            if (self.hash_scan_done and not self.hash_values) or \
+                    (self.config.max_limit and self.total_count + len(self.responses) >= self.config.max_limit):
+                self.done = True
+                self.cancel_hash_scan()
+                if self.need_del:
+                    await self.config.redis_del_method(self.config.key)
+
+            current_response_length = len(self.responses)
+            curr_miss_count = self.filter_responses()
+            if current_response_length:
+                logging.info("Get %d items from %s, filtered: %d items, percentage: %.2f%%" %
+                             (current_response_length, self.config.name, curr_miss_count,
+                              (self.total_count / self.total_size * 100) if self.total_size else 0))
+            if self.responses:
+                return self.clear_and_return()
+
+        logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                     (self.config.name, self.total_count, self.miss_count))
+        self.init_val()
+        raise StopAsyncIteration
+
+    def start_hash_scan(self):
+        self.hash_future = asyncio.ensure_future(
+            self.config.redis_read_method(self.config.key, cursor=self.hash_cursor, count=self.config.per_limit))
+
+    def cancel_hash_scan(self):
+        if self.hash_future is not None:
+            self.hash_future.cancel()
+            self.hash_future = None
+
+    async def next_hash_page(self, retry=1):
+        """
+        wait for the page being fetched, then start fetching the next page
+        :return: list of values, None if give up
+        """
+        if self.hash_future is None:
+            self.start_hash_scan()
+        try:
+            cursor, pairs = await self.hash_future
+        except Exception as e:
+            # cursor is not moved, fetch the same page again
+            self.hash_future = None
+            if retry < self.config.max_retry:
+                logging.error("retry: %d, %s" % (retry, str(e)))
+                await asyncio.sleep(random.uniform(self.config.random_min_sleep, self.config.random_max_sleep))
+                return await self.next_hash_page(retry + 1)
+            logging.error("Give up redis getter, After retry: %d times, still fail to get key: %s, "
+                          "total get %d items, total filtered: %d items, reason: %s" %
+                          (self.config.max_retry, self.config.key, self.total_count, self.miss_count,
+                           str(traceback.format_exc())))
+            return None
+
+        self.hash_future = None
+        self.hash_cursor = cursor
+        if cursor == 0:
+            self.hash_scan_done = True
+        else:
+            self.start_hash_scan()
+        return [value for _, value in pairs]
+
+    async def stream_anext(self):
+        """
+        read entries of stream in consumer group, entries returned last time are acknowledged before reading next
+        """
+        field = self.config.stream_field.encode(self.config.encoding) if self.config.compress else \
+            self.config.stream_field
+        while True:
+            messages = await self.read_stream()
+            if messages is None:
+                logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                             (self.config.name, self.total_count, self.miss_count))
+                self.init_val()
+                raise StopAsyncIteration
+
+            values = list()
+            for _, message_id, fields in messages:
+                self.ack_ids.append(message_id)
+                if self.latest_id != ">":
+                    self.latest_id = message_id
+                # fields of pending entry deleted from stream is None
+                if fields and field in fields:
+                    values.append(fields[field])
+            self.responses = await self.config.codec.loads_batch(values)
+
+            curr_miss_count = self.filter_responses()
+            if self.config.max_limit and self.total_count >= self.config.max_limit:
+                self.done = True
+            logging.info("Get %d items from %s, filtered: %d items" %
+                         (len(messages), self.config.name, curr_miss_count))
+            if self.responses:
+                return self.clear_and_return()
+
+    async def read_stream(self, retry=1):
+        """
+        acknowledge entries returned last time, then read next batch, pending entries of this consumer first
+        :return: list of (stream, id, fields), None if done
+        """
+        try:
+            cli = await get_node_client(self.config.redis_pool_cli, self.config.key)
+            if self.ack_ids:
+                await cli.xack(self.config.key, self.config.group, *self.ack_ids)
+                self.ack_ids = list()
+            if self.done:
+                return None
+
+            if not self.group_created:
+                try:
+                    await cli.xgroup_create(self.config.key, self.config.group, latest_id="0", mkstream=True)
+                except aioredis.errors.ReplyError as e:
+                    if "BUSYGROUP" not in str(e):
+                        raise
+                self.group_created = True
+
+            while True:
+                count = self.config.per_limit
+                if self.config.max_limit:
+                    count = min(count, self.config.max_limit - self.total_count)
+                # only block for new entries
+                block_args = [b"BLOCK", self.config.block] if self.latest_id == ">" and \
+                    self.config.block is not None else []
+                # parse the raw reply, xread_group of aioredis drops pending entries deleted from stream(fields
+                # is nil), they would never be acknowledged and stay pending forever
+                args = (b"XREADGROUP", b"GROUP", self.config.group, self.config.consumer, b"COUNT", count,
+                        *block_args, b"STREAMS", self.config.key, self.latest_id)
+                if block_args:
+                    # connections of pool are shared by commands, block on a dedicated one, otherwise other
+                    # commands sent to the same connection wait until the blocking read returns
+                    with await cli as conn:
+                        reply = await conn.execute(*args)
+                else:
+                    reply = await cli.execute(*args)
+                messages = [(stream, message_id, fields_to_dict(values) if values else None)
+                            for stream, entries in reply or () for message_id, values in entries]
+                if messages:
+                    return messages
+                if self.latest_id == ">":
+                    return None
+                # no more pending entries
+                self.latest_id = ">"
+        except Exception as e:
+            if retry < self.config.max_retry:
+                logging.error("retry: %d, %s" % (retry, str(e)))
+                await asyncio.sleep(random.uniform(self.config.random_min_sleep, self.config.random_max_sleep))
+                return await self.read_stream(retry + 1)
+            logging.error("Give up redis getter, After retry: %d times, still fail to get key: %s, "
+                          "total get %d items, total filtered: %d items, reason: %s" %
+                          (self.config.max_retry, self.config.key, self.total_count, self.miss_count,
+                           str(traceback.format_exc())))
+            return None
 
     def __iter__(self):
         raise ValueError("RedisGetter must be used with async generator, not normal generator")
@@ -0,0 +1,130 @@
+import asyncio
+import random
+import logging
+import traceback
+import collections
+from ..Config.DefaultValue import DefaultVal
+from ..Config.RedisConfig import get_node_client, shard_of
+
+
+class RedisLookup(object):
+    def __init__(self, config, key_func, target_key=None, cache_size=DefaultVal.redis_lookup_cache_size):
+        """
+        enrich each page of items with records stored in a redis HASH, fields missing in local cache are fetched
+        with HMGET, per_limit fields per command, all commands of a page sent in one pipeline per physical key
+
+        :param config: RRedisConfig with key_type HASH, key is the hash, values are decoded the same as RedisGetter,
+                       compress, shards, cluster_nodes and connection settings are honoured
+        :param key_func: function return hash field of an item, item is skipped if None returned
+        :param target_key: save record to item[target_key], if not set, record(dict) is merged into item
+        :param cache_size: LRU cache of field ==> record(missing fields are cached too), 0 means no cache
+
+        Example:
+            lookup = ProcessFactory.create_lookup(RRedisConfig("users", key_type="HASH"),
+                                                  key_func=lambda item: item["posterId"], target_key="poster")
+            async for items in getter:
+                items = await lookup.enrich(items)
+        """
+        if config.key_type != "HASH":
+            raise ValueError("RedisLookup only work for HASH key_type")
+        self.config = config
+        self.key_func = key_func
+        self.target_key = target_key
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+
+        self.total_count = 0
+        self.miss_count = 0
+        self.cache_hit_count = 0
+
+    async def enrich(self, items):
+        """
+        :return: items, modified in place
+        """
+        fields = [self.key_func(item) for item in items]
+        records = dict()
+        fetch_fields = list()
+        for field in fields:
+            if field is None or field in records:
+                continue
+            if field in self.cache:
+                self.cache.move_to_end(field)
+                records[field] = self.cache[field]
+                self.cache_hit_count += 1
+            else:
+                records[field] = None
+                fetch_fields.append(field)
+
+        if fetch_fields:
+            fetched = await self.fetch(fetch_fields)
+            records.update(fetched)
+            self.add_to_cache(fetched)
+
+        curr_miss_count = 0
+        for item, field in zip(items, fields):
+            if field is None:
+                continue
+            record = records[field]
+            if record is None:
+                curr_miss_count += 1
+            elif self.target_key:
+                item[self.target_key] = record
+            else:
+                item.update(record)
+
+        self.total_count += len(items)
+        self.miss_count += curr_miss_count
+        logging.info("%s lookup %d items, fetched %d fields, missing: %d items" %
+                     (self.config.name, len(items), len(fetch_fields), curr_miss_count))
+        return items
+
+    async def fetch(self, fields, retry=1):
+        """
+        :return: dict of field ==> record, None if field not exists
+        """
+        groups = collections.defaultdict(list)
+        for field in fields:
+            groups[self.config.keys[shard_of(field, len(self.config.keys))]].append(field)
+
+        try:
+            await self.config.get_redis_pool_cli()  # init redis pool
+            results = await asyncio.gather(*[self.fetch_key(key, key_fields) for key, key_fields in groups.items()])
+        except Exception as e:
+            if retry < self.config.max_retry:
+                logging.error("retry: %d, %s" % (retry, str(e)))
+                await asyncio.sleep(random.uniform(self.config.random_min_sleep, self.config.random_max_sleep))
+                return await self.fetch(fields, retry + 1)
+            logging.error("Give up redis lookup, After retry: %d times, still fail to get key: %s, "
+                          "%d items not enriched, reason: %s" %
+                          (self.config.max_retry, self.config.key, len(fields), str(traceback.format_exc())))
+            return dict()
+
+        records = dict()
+        for result in results:
+            records.update(result)
+        return records
+
+    async def fetch_key(self, key, fields):
+        cli = await get_node_client(self.config.redis_pool_cli, key)
+        pipe_line = cli.pipeline()
+        futures = list()
+        per_limit = self.config.per_limit
+        for i in range(0, len(fields), per_limit):
+            futures.append(pipe_line.hmget(key, *fields[i:i + per_limit]))
+        await pipe_line.execute()
+
+        values = list()
+        for future in futures:
+            values.extend(await future)
+        decoded = await self.config.codec.loads_batch([value for value in values if value is not None])
+        decoded = iter(decoded)
+        return {field: next(decoded) if value is not None else None for field, value in zip(fields, values)}
+
+    def add_to_cache(self, records):
+        if not self.cache_size:
+            return
+        for field, record in records.items():
+            self.cache[field] = record
+            self.cache.move_to_end(field)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
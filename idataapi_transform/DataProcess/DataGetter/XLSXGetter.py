@@ -1,8 +1,40 @@
+import asyncio
 import logging
+import itertools
+import collections
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from openpyxl import load_workbook
 from .BaseGetter import BaseGetter
 
 
+def iter_sheet_rows(sheet, sheet_key=None):
+    """
+    first row of sheet is headers, each row after it is converted to dict, only cell values are read
+    :param sheet_key: if set, add sheet title to each row with this key
+    """
+    rows = sheet.iter_rows(values_only=True)
+    headers = next(rows, None)
+    if headers is None:
+        return
+    for values in rows:
+        row = dict(zip(headers, values))
+        if sheet_key:
+            row[sheet_key] = sheet.title
+        yield row
+
+
+def read_sheet(filename, sheet_index, sheet_key):
+    """
+    run in worker process
+    :return: list of dict
+    """
+    wb = load_workbook(filename=filename, read_only=True)
+    try:
+        return list(iter_sheet_rows(wb.worksheets[sheet_index], sheet_key))
+    finally:
+        wb.close()
+
+
 class XLSXGetter(BaseGetter):
     def __init__(self, config):
         super().__init__()
@@ -10,61 +42,56 @@ class XLSXGetter(BaseGetter):
         self.wb = load_workbook(filename=self.config.filename, read_only=True)
         if not self.wb.worksheets:
             raise ValueError("Empty file: %s" % (self.config.filename, ))
-        self.sheet = self.wb.worksheets[self.config.sheet_index]
-        self.row_iter = self.sheet.rows
-        self.headers = self.generate_headers()
-
-        self.max_row = self.sheet.max_row
-        if self.config.max_limit and self.config.max_limit > self.max_row:
-            self.max_row = self.config.max_limit + 1  # add first headers
+        if self.config.all_sheets:
+            self.sheet_indexes = list(range(len(self.wb.worksheets)))
+        else:
+            self.sheet_indexes = [self.config.sheet_index]
+        self.parallel = bool(self.config.workers and self.config.workers > 1 and len(self.sheet_indexes) > 1)
 
-        self.row_num = 0
         self.responses = list()
-        self.curr_size = 0
         self.done = False
         self.miss_count = 0
         self.total_count = 0
 
+        self.executor = None
+        self.pending = None
+        self.futures = None
+        self.row_iter = self.rows()
+
     def init_val(self):
-        self.row_num = 0
         self.responses = list()
-        self.curr_size = 0
         self.done = False
         self.miss_count = 0
         self.total_count = 0
+        self.free_executor()
+        self.row_iter = self.rows()
 
-        self.row_iter = self.sheet.rows
+    def rows(self):
+        return itertools.chain.from_iterable(iter_sheet_rows(self.wb.worksheets[index], self.config.sheet_key)
+                                             for index in self.sheet_indexes)
 
     def __aiter__(self):
         return self
 
     async def __anext__(self):
+        if self.parallel:
+            return await self.parallel_anext()
+
         if self.done:
             logging.info("get source done: %s, total get %d items, total filtered: %d items" %
                          (self.config.filename, self.total_count, self.miss_count))
             self.init_val()
             raise StopAsyncIteration
 
-        while self.row_num < self.max_row:
-            if self.row_num == 0:
-                self.row_num += 1
-                continue
-
-            self.row_num += 1
-            self.total_count += 1
-            row = self.get_next_row()
-            if self.config.filter:
-                row = self.config.filter(row)
-                if not row:
-                    self.miss_count += 1
-                    continue
-            self.responses.append(row)
-            if len(self.responses) > self.config.per_limit:
-                self.curr_size += len(self.responses)
-                return self.clear_and_return()
+        for row in self.row_iter:
+            self.add_rows((row, ))
+            if len(self.responses) >= self.config.per_limit:
+                return self.clear_and_return_per_limit()
+            if self.done:
+                break
 
+        self.done = True
         if self.responses:
-            self.done = True
             return self.clear_and_return()
 
         logging.info("get source done: %s, total get %d items, total filtered: %d items" %
@@ -72,50 +99,122 @@ class XLSXGetter(BaseGetter):
         self.init_val()
         raise StopAsyncIteration
 
-    def generate_headers(self):
-        keys = list()
-        try:
-            row = next(self.row_iter)
-            for each in row:
-                keys.append(each.value)
-        except StopIteration:
-            pass
-        return keys
-
-    def get_next_row(self):
-        ret_item = dict()
-        r = next(self.row_iter)
-        for key, cell in zip(self.headers, r):
-            ret_item[key] = cell.value
-        return ret_item
-
     def __iter__(self):
-        for row_num in range(self.max_row):
-            if row_num == 0:
-                continue
+        if self.parallel:
+            yield from self.parallel_iter()
+            return
+
+        for row in self.row_iter:
+            self.add_rows((row, ))
+            if len(self.responses) >= self.config.per_limit:
+                yield self.clear_and_return_per_limit()
+            if self.done:
+                break
+
+        if self.responses:
+            yield self.clear_and_return()
+
+        logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                     (self.config.filename, self.total_count, self.miss_count))
+        self.init_val()
+
+    async def parallel_anext(self):
+        loop = asyncio.get_event_loop()
+        if self.executor is None and not self.done:
+            self.pending = collections.deque(self.sheet_indexes)
+            self.futures = collections.deque()
+            self.executor = ProcessPoolExecutor(max_workers=self.config.workers)
+
+        while not self.done and len(self.responses) < self.config.per_limit:
+            # each sheet is loaded in memory by worker, at most one sheet per worker in flight
+            while self.pending and len(self.futures) < self.config.workers:
+                self.futures.append(loop.run_in_executor(self.executor, read_sheet, self.config.filename,
+                                                         self.pending.popleft(), self.config.sheet_key))
+            if not self.futures:
+                self.done = True
+                break
+            if self.config.ordered:
+                rows = await self.futures.popleft()
+            else:
+                done, _ = await asyncio.wait(self.futures, return_when=asyncio.FIRST_COMPLETED)
+                future = done.pop()
+                self.futures.remove(future)
+                rows = future.result()
+            self.add_rows(rows)
+
+        if self.responses:
+            return self.clear_and_return_per_limit()
+
+        logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                     (self.config.filename, self.total_count, self.miss_count))
+        self.init_val()
+        raise StopAsyncIteration
+
+    def parallel_iter(self):
+        self.pending = collections.deque(self.sheet_indexes)
+        self.futures = collections.deque()
+        self.executor = ProcessPoolExecutor(max_workers=self.config.workers)
+
+        while True:
+            # each sheet is loaded in memory by worker, at most one sheet per worker in flight
+            while self.pending and len(self.futures) < self.config.workers:
+                self.futures.append(self.executor.submit(read_sheet, self.config.filename, self.pending.popleft(),
+                                                         self.config.sheet_key))
+            if not self.futures:
+                break
+            if self.config.ordered:
+                rows = self.futures.popleft().result()
+            else:
+                done, _ = wait(self.futures, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                self.futures.remove(future)
+                rows = future.result()
+            self.add_rows(rows)
+            while len(self.responses) >= self.config.per_limit:
+                yield self.clear_and_return_per_limit()
+            if self.done:
+                break
+
+        if self.responses:
+            yield self.clear_and_return()
+
+        logging.info("get source done: %s, total get %d items, total filtered: %d items" %
+                     (self.config.filename, self.total_count, self.miss_count))
+        self.init_val()
+
+    def add_rows(self, rows):
+        for row in rows:
+            if self.config.max_limit and self.total_count >= self.config.max_limit:
+                self.done = True
+                break
 
-            row_num += 1
             self.total_count += 1
-            row = self.get_next_row()
             if self.config.filter:
                 row = self.config.filter(row)
                 if not row:
                     self.miss_count += 1
                     continue
             self.responses.append(row)
-            if len(self.responses) > self.config.per_limit:
-                self.curr_size += len(self.responses)
-                yield self.clear_and_return()
 
-        if self.responses:
-            yield self.responses
+        if self.config.max_limit and self.total_count >= self.config.max_limit:
+            self.done = True
 
-            logging.info("get source done: %s, total get %d items, total filtered: %d items" %
-                         (self.config.filename, self.total_count, self.miss_count))
-            self.init_val()
+    def free_executor(self):
+        if self.executor is not None:
+            if self.futures:
+                for future in self.futures:
+                    future.cancel()
+            self.executor.shutdown(wait=False)
+            self.executor = self.pending = self.futures = None
 
     def __del__(self):
-        self.wb.close()
+        if getattr(self, "wb", None) is not None:
+            self.wb.close()
+
+    def clear_and_return_per_limit(self):
+        resp = self.responses[:self.config.per_limit]
+        self.responses = self.responses[self.config.per_limit:]
+        return resp
 
     def clear_and_return(self):
         resp = self.responses
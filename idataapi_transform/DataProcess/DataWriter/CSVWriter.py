@@ -2,7 +2,9 @@ import os
 import csv
 import types
 import logging
+import tempfile
 from .BaseWriter import BaseWriter
+from ..Config.FileConfig import open_file, get_compression
 
 
 class CSVWriter(BaseWriter):
@@ -10,11 +12,24 @@ class CSVWriter(BaseWriter):
         super().__init__()
         self.config = config
         self.file_already_exists = os.path.exists(self.config.filename) and os.path.getsize(self.config.filename)
-        self.f_out = open(self.config.filename, self.config.mode, encoding=self.config.encoding, newline="")
+        self.append_mode = "a" in self.config.mode and self.file_already_exists
+        self.compression = get_compression(self.config.filename, self.config.compression) or "none"
+        # characters can't be encoded are dropped by the file object, instead of re-encode each value
+        self.errors = None if self.config.encoding.lower() in ("utf8", "utf-8") else "ignore"
+        if self.config.evolve_headers:
+            # headers may grow, spool rows to temporary file, write to target file in __exit__
+            self.f_out = tempfile.TemporaryFile("w+", encoding=self.config.encoding, newline="", errors=self.errors,
+                                                dir=os.path.dirname(os.path.abspath(self.config.filename)))
+        else:
+            self.f_out = open_file(self.config.filename, self.config.mode, encoding=self.config.encoding, newline="",
+                                   errors=self.errors, compression=self.compression)
         self.f_csv = None
         self.headers = dict() if not self.config.headers else self.config.headers
+        self.header_set = None
+        self.exists_headers = None
         self.total_miss_count = 0
         self.success_count = 0
+        self.transform = self.qsn_transform if self.config.qsn else self.none_transform
 
     def write(self, responses):
         miss_count = 0
@@ -44,31 +59,54 @@ class CSVWriter(BaseWriter):
 
         # headers
         if not self.f_csv:
-            if "a" in self.config.mode and self.file_already_exists:
-                self.headers = self.generate_headers(responses, append_mode=True)
-                self.f_csv = csv.DictWriter(self.f_out, self.headers)
+            if self.append_mode:
+                self.headers = self.exists_headers = self.generate_headers(responses, append_mode=True)
+                self.f_csv = csv.writer(self.f_out)
             else:
                 if not self.headers:
                     self.headers = self.generate_headers(responses)
-                self.f_csv = csv.DictWriter(self.f_out, self.headers)
-                self.f_csv.writeheader()
-
+                self.f_csv = csv.writer(self.f_out)
+                if not self.config.evolve_headers:
+                    self.f_csv.writerow(self.headers)
+            self.headers = list(self.headers)
+            self.header_set = set(self.headers)
+
+        self.f_csv.writerows(self.build_rows(responses))
+        self.success_count += len(responses)
+        logging.info("%s write %d item, filtered %d item" % (self.config.filename, len(responses), miss_count))
 
-        # encoding process
+    def build_rows(self, responses):
+        """
+        :return: list of row, each row is a list of value in headers order
+        """
+        headers = self.headers
+        header_set = self.header_set
+        transform = self.transform
+        rows = list()
         for each_response in responses:
-            for k, v in each_response.items():
-                if v is None:
-                    each_response[k] = ""
-
-                elif self.config.qsn and v != "" and (isinstance(v, (int, float)) or isinstance(v, str) and all(i.isdigit() for i in v)):
-                    each_response[k] = repr(str(v))
-
-                elif self.config.encoding not in ("utf8", "utf-8"):
-                    each_response[k] = str(v).encode(self.config.encoding, "ignore").decode(self.config.encoding)
-
-            self.success_count += 1
-            self.f_csv.writerow(each_response)
-        logging.info("%s write %d item, filtered %d item" % (self.config.filename, len(responses), miss_count))
+            if each_response.keys() - header_set:
+                if not self.config.evolve_headers:
+                    raise ValueError("dict contains fields not in fieldnames: %s" %
+                                     (", ".join(repr(i) for i in each_response.keys() - header_set), ))
+                # new column always append to the tail, rows spooled before become prefix of the full row
+                for key in each_response.keys():
+                    if key not in header_set:
+                        headers.append(key)
+                        header_set.add(key)
+            rows.append([transform(each_response.get(key)) for key in headers])
+        return rows
+
+    @staticmethod
+    def none_transform(v):
+        return "" if v is None else v
+
+    @staticmethod
+    def qsn_transform(v):
+        if v is None:
+            return ""
+        elif isinstance(v, (int, float)) or isinstance(v, str) and v.isdigit():
+            return repr(str(v))
+        return v
 
     def generate_headers(self, responses, append_mode=False):
         headers = set()
@@ -77,19 +115,58 @@ class CSVWriter(BaseWriter):
                 headers.add(key)
 
         if append_mode:
-            f_in = open(self.config.filename, "r", encoding=self.config.encoding, newline="")
-            reader = csv.DictReader(f_in)
-            exists_fields = reader.fieldnames
+            with open_file(self.config.filename, "r", encoding=self.config.encoding, newline="",
+                           compression=self.compression) as f_in:
+                exists_fields = next(csv.reader(f_in))
+            if self.config.evolve_headers:
+                return exists_fields
             if set(exists_fields) != headers:
                 raise ValueError("append mode for csv file: %s, but header field mismatch, exist fields: %s, generated fields: %s" % (self.config.filename, repr(exists_fields), repr(headers)))
             return exists_fields
         return list(headers)
 
+    def write_spooled(self):
+        """
+        write spooled rows to target file, with full headers, in one sequential pass
+        """
+        width = len(self.headers)
+
+        def padding(rows):
+            for row in rows:
+                if len(row) < width:
+                    row.extend([""] * (width - len(row)))
+                yield row
+
+        self.f_out.seek(0, 0)
+        spooled_rows = padding(csv.reader(self.f_out))
+        if self.append_mode and self.exists_headers is not None and len(self.exists_headers) < width:
+            # new columns, rows already in file need to be rewritten with full headers
+            tmp_filename = self.config.filename + ".tmp"
+            with open_file(tmp_filename, "w", encoding=self.config.encoding, newline="", errors=self.errors,
+                           compression=self.compression) as f_out, \
+                    open_file(self.config.filename, "r", encoding=self.config.encoding, newline="",
+                              compression=self.compression) as f_in:
+                f_csv = csv.writer(f_out)
+                f_csv.writerow(self.headers)
+                exists_rows = csv.reader(f_in)
+                next(exists_rows)
+                f_csv.writerows(padding(exists_rows))
+                f_csv.writerows(spooled_rows)
+            os.replace(tmp_filename, self.config.filename)
+        else:
+            with open_file(self.config.filename, self.config.mode, encoding=self.config.encoding, newline="",
+                           errors=self.errors, compression=self.compression) as f_out:
+                f_csv = csv.writer(f_out)
+                if not self.append_mode and self.headers:
+                    f_csv.writerow(self.headers)
+                f_csv.writerows(spooled_rows)
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.config.evolve_headers:
+            self.write_spooled()
         self.f_out.close()
         logging.info("%s write done, total filtered %d item, total write %d item" %
                      (self.config.filename, self.total_miss_count, self.success_count))
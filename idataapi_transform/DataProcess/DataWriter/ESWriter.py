@@ -3,6 +3,7 @@ import asyncio
 import random
 from .BaseWriter import BaseWriter
 from ..Config.MainConfig import main_config
+from ..Config.DefaultValue import DefaultVal
 
 
 class ESWriter(BaseWriter):
@@ -15,6 +16,9 @@ class ESWriter(BaseWriter):
         self.total_miss_count = 0
         self.success_count = 0
         self.fail_count = 0
+        self.origin_settings = None
+        # bulk settings are only applied and restored by "async with"
+        self.async_entered = False
 
     async def write(self, responses):
         response = None  # something to return
@@ -24,6 +28,9 @@ class ESWriter(BaseWriter):
             responses = [i for i in responses if i]
         miss_count = origin_length - len(responses)
         self.total_miss_count += miss_count
+        if self.config.bulk_mode and not self.async_entered:
+            raise ValueError("%s bulk_mode needs the writer used with 'async with', so that original index settings "
+                             "are restored before exit" % (self.config.indices, ))
         if responses:
             if self.config.expand:
                 responses = [self.expand_dict(i) for i in responses]
@@ -53,9 +60,15 @@ class ESWriter(BaseWriter):
             logging.info("Write 0 items to index: %s, doc_type: %s (all filtered, or pass empty result)" % (self.config.indices, self.config.doc_type))
         return response
 
-    async def delete_all(self, body=None):
+    async def delete_all(self, body=None, slices=DefaultVal.es_slices,
+                         requests_per_second=DefaultVal.es_requests_per_second,
+                         poll_interval=DefaultVal.es_task_poll_interval):
         """
-        inefficient delete
+        delete_by_query in background, poll tasks API until it finished
+        :param body: query body, default delete all
+        :param slices: number of slices to parallelize the delete, "auto" means one slice per shard
+        :param requests_per_second: throttle, None means no throttle
+        :param poll_interval: seconds between each poll of the task status
         """
         if not body:
             body = {
@@ -63,9 +76,72 @@ class ESWriter(BaseWriter):
                     "match_all": {}
                 }
             }
-        result = await self.config.es_client.delete_by_query(index=self.config.indices, doc_type=self.config.doc_type,
-                                                             body=body, params={"conflicts": "proceed"})
-        return result
+        return await self.config.es_client.perform_task("delete_by_query", self.config.indices, body,
+                                                        doc_type=self.config.doc_type, conflicts="proceed",
+                                                        slices=slices, requests_per_second=requests_per_second,
+                                                        poll_interval=poll_interval, name=self.config.indices + "->" + self.config.doc_type)
+
+    async def update_by_query(self, body=None, slices=DefaultVal.es_slices,
+                              requests_per_second=DefaultVal.es_requests_per_second,
+                              poll_interval=DefaultVal.es_task_poll_interval):
+        """
+        update_by_query in background, poll tasks API until it finished
+        :param body: query body with "script", default reindex every document in place
+        """
+        return await self.config.es_client.perform_task("update_by_query", self.config.indices,
+                                                        doc_type=self.config.doc_type, body=body, conflicts="proceed",
+                                                        slices=slices, requests_per_second=requests_per_second,
+                                                        poll_interval=poll_interval, name=self.config.indices + "->" + self.config.doc_type)
+
+    async def reindex_from(self, source_indices, query_body=None, slices=DefaultVal.es_slices,
+                           requests_per_second=DefaultVal.es_requests_per_second,
+                           poll_interval=DefaultVal.es_task_poll_interval):
+        """
+        reindex documents from source_indices to indices of this writer in background,
+        poll tasks API until it finished
+        :param source_indices: indices to copy from
+        :param query_body: only copy documents matched, i.e {"query": {"term": {"appCode": "ctrip"}}}
+        """
+        source = {"index": source_indices}
+        if query_body and "query" in query_body:
+            source["query"] = query_body["query"]
+        body = {
+            "conflicts": "proceed",
+            "source": source,
+            "dest": {"index": self.config.indices, "type": self.config.doc_type}
+        }
+        return await self.config.es_client.perform_task("reindex", body, slices=slices,
+                                                        requests_per_second=requests_per_second,
+                                                        poll_interval=poll_interval, name=self.config.indices + "->" + self.config.doc_type)
+
+    async def apply_bulk_settings(self):
+        """
+        save current settings of indices, then switch to config.bulk_settings
+        """
+        if not await self.config.es_client.indices.exists(index=self.config.indices):
+            await self.config.es_client.indices.create(index=self.config.indices,
+                                                       body={"settings": self.config.bulk_settings})
+            self.origin_settings = {self.config.indices: dict()}
+        else:
+            r = await self.config.es_client.indices.get_settings(index=self.config.indices, flat_settings=True)
+            self.origin_settings = dict()
+            for index, value in r.items():
+                self.origin_settings[index] = {k: value["settings"].get(k) for k in self.config.bulk_settings}
+            await self.config.es_client.indices.put_settings(body=self.config.bulk_settings, index=self.config.indices)
+        logging.info("%s switch to bulk settings: %s" % (self.config.indices, str(self.config.bulk_settings)))
+
+    async def restore_index_settings(self):
+        """
+        restore settings saved by apply_bulk_settings, setting not exist before will reset to default value
+        """
+        if self.origin_settings is None:
+            return
+        for index, settings in self.origin_settings.items():
+            settings = {k: settings.get(k) for k in self.config.bulk_settings}
+            await self.config.es_client.indices.put_settings(body=settings, index=index)
+        await self.config.es_client.indices.refresh(index=self.config.indices)
+        self.origin_settings = None
+        logging.info("%s restore index settings and refresh" % (self.config.indices, ))
 
     def __enter__(self):
         return self
@@ -74,3 +150,16 @@ class ESWriter(BaseWriter):
         logging.info("%s->%s write done, total filtered %d item, total write %d item, total fail: %d item" %
                      (self.config.indices, self.config.doc_type, self.total_miss_count, self.success_count,
                       self.fail_count))
+
+    async def __aenter__(self):
+        if self.config.bulk_mode:
+            await self.apply_bulk_settings()
+        self.async_entered = True
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.async_entered = False
+        try:
+            await self.restore_index_settings()
+        finally:
+            self.__exit__(exc_type, exc_val, exc_tb)
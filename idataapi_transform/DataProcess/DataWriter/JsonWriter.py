@@ -1,6 +1,8 @@
+import os
 import json
 import logging
 from .BaseWriter import BaseWriter
+from ..Config.FileConfig import open_file, part_filename
 
 
 class JsonWriter(BaseWriter):
@@ -9,10 +11,89 @@ class JsonWriter(BaseWriter):
         self.config = config
         self.total_miss_count = 0
         self.success_count = 0
-        self.f_out = open(self.config.filename, self.config.mode, encoding=self.config.encoding)
+        self.rotate = bool(self.config.max_file_size or self.config.max_items_per_file)
+        # files written, in order, downstream can consume finished parts while writing
+        self.filenames = list()
+        self.part_index = 0
+        self.part_size = 0
+        self.part_count = 0
+        if self.rotate and "a" in self.config.mode:
+            # continue after the last exists part
+            while os.path.exists(part_filename(self.config.filename, self.part_index + 1)):
+                self.part_index += 1
+            filename = part_filename(self.config.filename, self.part_index)
+            if os.path.exists(filename):
+                # limits count what is already in the part
+                self.part_size, self.part_count = self.part_stat(filename)
+        self.f_out = self.open_part()
+
+    def part_stat(self, filename):
+        """
+        :return: (characters before compression, number of items) of an exist part
+        """
+        new_line = self.config.new_line
+        size = count = 0
+        tail = ""
+        with open_file(filename, "r", encoding=self.config.encoding, compression=self.config.compression,
+                       newline="") as f_in:
+            while True:
+                block = f_in.read(1024 * 1024)
+                if not block:
+                    break
+                size += len(block)
+                # new_line may be split between blocks
+                block = tail + block
+                count += block.count(new_line)
+                tail = block[-(len(new_line) - 1):] if len(new_line) > 1 else ""
+        return size, count
+
+    def open_part(self):
+        if self.rotate:
+            filename = part_filename(self.config.filename, self.part_index)
+        else:
+            filename = self.config.filename
+        self.filenames.append(filename)
+        return open_file(filename, self.config.mode, encoding=self.config.encoding,
+                         compression=self.config.compression, buffering=self.config.buffer_size)
+
+    def next_part(self):
+        self.f_out.close()
+        logging.info("%s part done, %d item" % (self.filenames[-1], self.part_count))
+        self.part_index += 1
+        self.part_size = 0
+        self.part_count = 0
+        self.f_out = self.open_part()
+
+    def part_full(self):
+        return (self.config.max_items_per_file and self.part_count >= self.config.max_items_per_file) or \
+               (self.config.max_file_size and self.part_size >= self.config.max_file_size)
+
+    def write_lines(self, lines):
+        """
+        :param lines: serialised items of a page, joined and written at once
+        """
+        new_line = self.config.new_line
+        if not self.rotate:
+            if lines:
+                self.f_out.write(new_line.join(lines) + new_line)
+            return
+
+        start = 0
+        for index, line in enumerate(lines):
+            # rotate lazily, so that no empty part left behind
+            if self.part_full():
+                if start < index:
+                    self.f_out.write(new_line.join(lines[start:index]) + new_line)
+                start = index
+                self.next_part()
+            self.part_size += len(line) + len(new_line)
+            self.part_count += 1
+        if start < len(lines):
+            self.f_out.write(new_line.join(lines[start:]) + new_line)
 
     def write(self, responses):
         miss_count = 0
+        lines = list()
         for each_response in responses:
             if self.config.expand:
                 each_response = self.expand_dict(each_response, max_expand=self.config.expand)
@@ -22,8 +103,9 @@ class JsonWriter(BaseWriter):
                 if not each_response:
                     miss_count += 1
                     continue
-            self.f_out.write(json.dumps(each_response) + self.config.new_line)
-            self.success_count += 1
+            lines.append(json.dumps(each_response))
+        self.write_lines(lines)
+        self.success_count += len(lines)
         self.total_miss_count += miss_count
         logging.info("%s write %d item, filtered %d item" % (self.config.filename, len(responses), miss_count))
 
@@ -57,11 +57,19 @@ class MongoWriter(BaseWriter):
 
     async def perform_write(self, responses):
         try_time = 0
+        no_id_responses = list()
         for each in responses:
             if self.config.auto_insert_createDate and self.config.createDate is not None:
                 each["createDate"] = self.config.createDate
             if "_id" not in each:
-                each["_id"] = self.config.id_hash_func(each)
+                no_id_responses.append(each)
+
+        if hasattr(self.config.id_hash_func, "batch"):
+            ids = self.config.id_hash_func.batch(no_id_responses)
+        else:
+            ids = [self.config.id_hash_func(each) for each in no_id_responses]
+        for each, id_ in zip(no_id_responses, ids):
+            each["_id"] = id_
 
         while try_time < self.config.max_retry:
             try:
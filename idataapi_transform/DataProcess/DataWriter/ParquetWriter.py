@@ -0,0 +1,136 @@
+import json
+import logging
+from .BaseWriter import BaseWriter
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except Exception as e:
+    pass
+
+
+class ParquetWriter(BaseWriter):
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+        self.total_miss_count = 0
+        self.success_count = 0
+        self.schema = self.config.schema
+        self.writer = None
+        # items buffered until a row group filled
+        self.buffer = list()
+        self.dropped_keys = set()
+
+    def write(self, responses):
+        miss_count = 0
+        for each_response in responses:
+            if self.config.expand:
+                each_response = self.expand_dict(each_response, max_expand=self.config.expand)
+
+            if self.config.filter:
+                each_response = self.config.filter(each_response)
+                if not each_response:
+                    miss_count += 1
+                    continue
+            self.buffer.append(each_response)
+            self.success_count += 1
+            if len(self.buffer) >= self.config.row_group_size:
+                self.write_row_group()
+
+        self.total_miss_count += miss_count
+        logging.info("%s write %d item, filtered %d item" % (self.config.filename, len(responses), miss_count))
+
+    def infer_schema(self, items):
+        """
+        column order follows the first appearance of each key, column type inferred by pyarrow,
+        column with mixed types are saved as string, column with only null are saved as string
+        """
+        keys = dict()
+        for item in items:
+            for key in item:
+                keys[key] = None
+        fields = list()
+        for key in keys:
+            values = [item.get(key) for item in items]
+            try:
+                data_type = pyarrow.array(values).type
+            except (pyarrow.ArrowException, TypeError, ValueError, OverflowError):
+                data_type = pyarrow.string()
+            if pyarrow.types.is_null(data_type):
+                data_type = pyarrow.string()
+            fields.append(pyarrow.field(str(key), data_type))
+        return pyarrow.schema(fields)
+
+    def to_array(self, values, field):
+        try:
+            return pyarrow.array(values, type=field.type), 0
+        except (pyarrow.ArrowException, TypeError, ValueError, OverflowError):
+            pass
+
+        # convert one by one, null for values can't convert
+        fail_count = 0
+        converted = list()
+        for value in values:
+            if value is not None and pyarrow.types.is_string(field.type) and not isinstance(value, str):
+                # json for nested value, so that other tools can read it back
+                if isinstance(value, (dict, list)):
+                    value = json.dumps(value, ensure_ascii=False, default=str)
+                else:
+                    value = str(value)
+            try:
+                pyarrow.array([value], type=field.type)
+            except (pyarrow.ArrowException, TypeError, ValueError, OverflowError):
+                value = None
+                fail_count += 1
+            converted.append(value)
+        return pyarrow.array(converted, type=field.type), fail_count
+
+    def write_row_group(self):
+        items = self.buffer
+        self.buffer = list()
+        if not items:
+            return
+        if self.schema is None:
+            self.schema = self.infer_schema(items)
+            logging.info("%s schema inferred: %s" % (self.config.filename, str(self.schema).replace("\n", ", ")))
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.config.filename, self.schema,
+                                                        compression=self.config.compression,
+                                                        use_dictionary=self.config.use_dictionary)
+
+        names = set(self.schema.names)
+        for item in items:
+            for key in item:
+                if key not in names:
+                    self.dropped_keys.add(key)
+
+        arrays = list()
+        fail_count = 0
+        for field in self.schema:
+            array, count = self.to_array([item.get(field.name) for item in items], field)
+            arrays.append(array)
+            fail_count += count
+        if fail_count:
+            logging.warning("%s %d values can't convert to column type, written as null" %
+                            (self.config.filename, fail_count))
+
+        table = pyarrow.Table.from_arrays(arrays, schema=self.schema)
+        self.writer.write_table(table, row_group_size=self.config.row_group_size)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.write_row_group()
+        if self.writer is not None:
+            self.writer.close()
+        elif self.schema is not None:
+            # nothing written, still create a file with schema
+            pyarrow.parquet.ParquetWriter(self.config.filename, self.schema).close()
+        else:
+            logging.warning("%s nothing written and no schema provided, file not created" % (self.config.filename, ))
+        if self.dropped_keys:
+            logging.warning("%s keys not in schema are dropped: %s" %
+                            (self.config.filename, str(sorted(str(key) for key in self.dropped_keys))))
+        logging.info("%s write done, total filtered %d item, total write %d item" %
+                     (self.config.filename, self.total_miss_count, self.success_count))
+
+    def __enter__(self):
+        return self
@@ -2,9 +2,8 @@ import logging
 import asyncio
 import random
 import traceback
-import json
-import zlib
 from .BaseWriter import BaseWriter
+from ..Config.RedisConfig import get_node_client, shard_of
 
 
 class RedisWriter(BaseWriter):
@@ -13,12 +12,13 @@ class RedisWriter(BaseWriter):
         self.config = config
         self.total_miss_count = 0
         self.success_count = 0
+        # shard of next chunk, chunks are spread over shards round robin
+        self.next_shard = 0
+        # keys written in current write whose expire is not set yet
+        self.pending_expire = set()
 
     def encode(self, dict_object):
-        string = json.dumps(dict_object)
-        if self.config.compress:
-            string = zlib.compress(string.encode(self.config.encoding))
-        return string
+        return self.config.codec.dumps(dict_object)
 
     async def write(self, responses):
         await self.config.get_redis_pool_cli()  # init redis pool
@@ -35,16 +35,16 @@ class RedisWriter(BaseWriter):
         self.total_miss_count += miss_count
         if target_responses:
             try_time = 0
+            values = await self.config.codec.dumps_batch(target_responses)
+            if self.config.key_type == "HASH":
+                values = list(zip(self.hash_fields(target_responses), values))
+            chunks = self.split_chunks(values)
+            if self.config.expire:
+                self.pending_expire = set(key for key, key_chunks in chunks.items() if key_chunks)
             while try_time < self.config.max_retry:
                 try:
-                    if self.config.is_range:
-                        await self.config.redis_write_method(self.config.key, *(self.encode(i) for i in target_responses))
-                    else:
-                        pipe_line = self.config.redis_pool_cli.pipeline()
-                        for each in responses:
-                            pipe_line.hset(self.config.key, each["id"], self.encode(each))
-                        await pipe_line.execute()
-
+                    # chunks pushed are removed, retry continue with the rest
+                    await self.push_chunks(chunks)
                     logging.info("%s write %d item, filtered %d item" % (self.config.name, len(responses), miss_count))
                     break
                 except Exception as e:
@@ -58,6 +58,108 @@ class RedisWriter(BaseWriter):
         else:
             logging.info("Write 0 items to %s, filtered: %d, (all filtered, or pass empty result)" % (self.config.name, miss_count))
 
+    def hash_fields(self, responses):
+        """
+        :return: list of hash field of each item
+        """
+        no_id_responses = [each for each in responses if "id" not in each]
+        if hasattr(self.config.id_hash_func, "batch"):
+            ids = self.config.id_hash_func.batch(no_id_responses)
+        else:
+            ids = [self.config.id_hash_func(each) for each in no_id_responses]
+        ids = iter(ids)
+        return [each["id"] if "id" in each else next(ids) for each in responses]
+
+    def split_chunks(self, values):
+        """
+        :return: dict of physical key ==> list of chunks
+        """
+        keys = self.config.keys
+        chunk_size = self.config.chunk_size
+        if len(keys) > 1 and self.config.key_type == "HASH":
+            # same field always in same shard
+            groups = [list() for _ in keys]
+            for pair in values:
+                groups[shard_of(pair[0], len(keys))].append(pair)
+            return {key: [group[i:i + chunk_size] for i in range(0, len(group), chunk_size)]
+                    for key, group in zip(keys, groups)}
+
+        chunks = {key: list() for key in keys}
+        for i in range(0, len(values), chunk_size):
+            chunks[keys[self.next_shard]].append(values[i:i + chunk_size])
+            self.next_shard = (self.next_shard + 1) % len(keys)
+        return chunks
+
+    async def push_chunks(self, chunks):
+        """
+        push chunks of each physical key concurrently, raise the first error after all keys finished
+        """
+        results = await asyncio.gather(*[self.push_key_chunks(key, key_chunks)
+                                         for key, key_chunks in chunks.items()
+                                         if key_chunks or key in self.pending_expire], return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def push_key_chunks(self, key, chunks):
+        """
+        push each chunk in one LPUSH/RPUSH/HMSET command(one XADD per item for STREAM), pipeline_chunks chunks per
+        pipeline, or all chunks in one MULTI/EXEC if transaction, expire is sent with the last pipeline,
+        commands succeeded are removed from chunks even if others in the same pipeline failed, so that a retry
+        only sends what is not written yet, the first error is raised after chunks updated
+        """
+        cli = await get_node_client(self.config.redis_pool_cli, key)
+        step = len(chunks) if self.config.transaction else self.config.pipeline_chunks
+        while chunks or key in self.pending_expire:
+            pipe_line = cli.multi_exec() if self.config.transaction else cli.pipeline()
+            sent = chunks[:step]
+            command_counts = [self.queue_chunk(pipe_line, key, chunk) for chunk in sent]
+            send_expire = key in self.pending_expire and len(chunks) <= step
+            if send_expire:
+                pipe_line.expire(key, self.config.expire)
+            results = await pipe_line.execute(return_exceptions=True)
+
+            error = None
+            remain = list()
+            index = 0
+            for chunk, count in zip(sent, command_counts):
+                chunk_results = results[index:index + count]
+                index += count
+                errors = [result for result in chunk_results if isinstance(result, Exception)]
+                if not errors:
+                    continue
+                error = error or errors[0]
+                if self.config.key_type == "STREAM":
+                    # one XADD per item, only items failed are sent again
+                    remain.append([value for value, result in zip(chunk, chunk_results)
+                                   if isinstance(result, Exception)])
+                else:
+                    remain.append(chunk)
+            if send_expire:
+                if isinstance(results[index], Exception):
+                    error = error or results[index]
+                else:
+                    self.pending_expire.discard(key)
+            chunks[:len(sent)] = remain
+            if error is not None:
+                raise error
+
+    def queue_chunk(self, pipe_line, key, chunk):
+        """
+        :return: number of commands queued
+        """
+        if self.config.key_type == "HASH":
+            pipe_line.hmset(key, *[value for pair in chunk for value in pair])
+        elif self.config.key_type == "STREAM":
+            for value in chunk:
+                pipe_line.xadd(key, {self.config.stream_field: value}, max_len=self.config.max_len)
+            return len(chunk)
+        elif self.config.direction == "L":
+            pipe_line.lpush(key, *chunk)
+        else:
+            pipe_line.rpush(key, *chunk)
+        return 1
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         logging.info("%s write done, total filtered %d item, total write %d item" %
                      (self.config.name, self.total_miss_count, self.success_count))
@@ -1,12 +1,13 @@
 import logging
 from .BaseWriter import BaseWriter
+from ..Config.FileConfig import open_file
 
 
 class TXTWriter(BaseWriter):
     def __init__(self, config):
         super().__init__()
         self.config = config
-        self.f_out = open(config.filename, config.mode, encoding=config.encoding)
+        self.f_out = open_file(config.filename, config.mode, encoding=config.encoding, compression=config.compression)
         self.total_miss_count = 0
         self.success_count = 0
 
@@ -1,6 +1,7 @@
-import re
 import os
+import math
 import logging
+import itertools
 from openpyxl import Workbook, load_workbook
 from .BaseWriter import BaseWriter
 from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
@@ -8,6 +9,12 @@ from ..Config.DefaultValue import DefaultVal
 
 _warning = False
 
+# str.translate table removing the characters matched by ILLEGAL_CHARACTERS_RE, characters beyond the table kept
+_illegal_characters = set(itertools.chain(range(0o0, 0o11), range(0o13, 0o15), range(0o16, 0o40)))
+_illegal_characters_table = [None if i in _illegal_characters else i for i in range(0o40)]
+# larger integers lose precision in excel, saved as string
+_max_exact_int = 10 ** 15
+
 
 class XLSXWriter(BaseWriter):
     def __init__(self, config):
@@ -19,24 +26,36 @@ class XLSXWriter(BaseWriter):
         # headers
         self.header_generated = False
         self.file_already_exists = os.path.exists(self.config.filename)
-        if "a" in self.config.mode and self.file_already_exists:
-            self.wb = load_workbook(filename=self.config.filename, read_only=False)
-            self.generate_header(from_file=True)
+        # streaming mode
+        self.sheet_count = 0
+        self.sheet_row = 0
+        if self.config.streaming:
+            self.wb = Workbook(write_only=True)
+            self.ws1 = None
         else:
-            self.wb = Workbook()
-        self.ws1 = self.wb.active
-        self.ws1.title = config.title
+            if "a" in self.config.mode and self.file_already_exists:
+                self.wb = load_workbook(filename=self.config.filename, read_only=False)
+                self.generate_header(from_file=True)
+            else:
+                self.wb = Workbook()
+            self.ws1 = self.wb.active
+            self.ws1.title = config.title
         self.total_miss_count = 0
         self.success_count = 0
-        if not _warning:
+        self.total_clean_count = 0
+        if not _warning and not self.config.streaming:
             logging.warning("XLSXWriter will actually write to file when __exit__ of XLSXWriter called")
             _warning = True
 
     def write(self, responses):
+        if self.config.streaming:
+            return self.write_streaming(responses)
+
         if not self.header_generated and self.config.headers:
             self.generate_header()
 
         miss_count = 0
+        clean_count = 0
         for each_response in responses:
             if self.config.expand:
                 each_response = self.expand_dict(each_response, max_expand=self.config.expand)
@@ -46,26 +65,129 @@ class XLSXWriter(BaseWriter):
                     miss_count += 1
                     continue
 
+            columns = list()
+            values = list()
             for key, value in each_response.items():
                 if key not in self.col_dict:
                     self.col_dict[key] = len(self.col_dict) + 1
                     self.ws1.cell(row=1, column=self.col_dict[key], value=key)
-                value = str(value) if value is not None else ""
-                try:
-                    self.ws1.cell(row=self.row, column=self.col_dict[key], value=value)
-                except Exception:
-                    new_value = re.sub(ILLEGAL_CHARACTERS_RE, "", value)
-                    logging.warning("row num: %d, key: %s, value: %s contains illegal characters, "
-                                    "replaced illegal characters to: %s" % (self.row, key, value, new_value))
-                    self.ws1.cell(row=self.row, column=self.col_dict[key], value=new_value)
+                columns.append(self.col_dict[key])
+                values.append(self.to_cell_value(value))
+            clean_count += self.clean_row(values)
+            for column, value in zip(columns, values):
+                self.ws1.cell(row=self.row, column=column, value=value)
 
             self.row += 1
             self.success_count += 1
+        self.log_clean_count(clean_count)
+        logging.info("%s write %d item, filtered %d item" % (self.config.filename, len(responses), miss_count))
+
+    def write_streaming(self, responses):
+        miss_count = 0
+        clean_count = 0
+        items = list()
+        for each_response in responses:
+            if self.config.expand:
+                each_response = self.expand_dict(each_response, max_expand=self.config.expand)
+            if self.config.filter:
+                each_response = self.config.filter(each_response)
+                if not each_response:
+                    miss_count += 1
+                    continue
+            items.append(each_response)
+
+        if not self.header_generated:
+            # headers of the first sheet from config or the first bulk of items
+            for key in self.config.headers if self.config.headers else ():
+                self.col_dict[key] = len(self.col_dict) + 1
+            for each_response in items:
+                for key in each_response:
+                    if key not in self.col_dict:
+                        self.col_dict[key] = len(self.col_dict) + 1
+            self.header_generated = True
+
+        for each_response in items:
+            if self.ws1 is None or self.sheet_row >= self.config.max_rows_per_sheet:
+                self.next_sheet()
+            row = [""] * len(self.col_dict)
+            for key, value in each_response.items():
+                if key not in self.col_dict:
+                    self.col_dict[key] = len(self.col_dict) + 1
+                    row.append("")
+                    logging.warning("%s new key: %s after headers written, header of column %d will be written "
+                                    "in next sheet" % (self.config.filename, key, self.col_dict[key]))
+                row[self.col_dict[key] - 1] = self.to_cell_value(value)
+            # write-only worksheet can't recover from a failed append, values are cleaned before append
+            clean_count += self.clean_row(row)
+            self.ws1.append(row)
+            self.sheet_row += 1
+            self.success_count += 1
+        self.total_miss_count += miss_count
+        self.log_clean_count(clean_count)
         logging.info("%s write %d item, filtered %d item" % (self.config.filename, len(responses), miss_count))
 
+    @staticmethod
+    def to_cell_value(value):
+        """
+        numbers and booleans keep their type, others are saved as string
+        """
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int):
+            return value if -_max_exact_int < value < _max_exact_int else str(value)
+        if isinstance(value, float):
+            return value if math.isfinite(value) else str(value)
+        return str(value)
+
+    @staticmethod
+    def clean_row(row):
+        """
+        remove illegal characters of strings in row in place, the whole row is checked at once,
+        only the strings of rows containing illegal characters are translated
+        :return: number of cells cleaned
+        """
+        strings = [value for value in row if type(value) is str]
+        if not ILLEGAL_CHARACTERS_RE.search("".join(strings)):
+            return 0
+        count = 0
+        for index, value in enumerate(row):
+            if type(value) is str:
+                new_value = value.translate(_illegal_characters_table)
+                if len(new_value) != len(value):
+                    row[index] = new_value
+                    count += 1
+        return count
+
+    def log_clean_count(self, clean_count):
+        if clean_count:
+            self.total_clean_count += clean_count
+            logging.warning("%s %d cells contain illegal characters, illegal characters removed" %
+                            (self.config.filename, clean_count))
+
+    def next_sheet(self):
+        """
+        streaming mode only, create a new sheet and write headers
+        """
+        title = self.config.title if self.sheet_count == 0 else "%s_%d" % (self.config.title, self.sheet_count)
+        if self.sheet_count:
+            logging.info("%s sheet %s full, %d rows, continue in sheet %s" %
+                         (self.config.filename, self.ws1.title, self.sheet_row, title))
+        self.ws1 = self.wb.create_sheet(title=title)
+        self.sheet_count += 1
+        self.ws1.append(list(self.col_dict.keys()))
+        self.sheet_row = 1
+
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.config.streaming and self.ws1 is None:
+            # nothing written, write headers only
+            self.next_sheet()
         self.wb.save(filename=self.config.filename)
         self.wb.close()
+        if self.total_clean_count:
+            logging.warning("%s total %d cells contain illegal characters, illegal characters removed" %
+                            (self.config.filename, self.total_clean_count))
         logging.info("%s write done, total filtered %d item, total write %d item" %
                      (self.config.filename, self.total_miss_count, self.success_count))
 
@@ -12,6 +12,8 @@ from .DataGetter.XLSXGetter import XLSXGetter
 from .DataGetter.RedisGetter import RedisGetter
 from .DataGetter.MySQLGetter import MySQLGetter
 from .DataGetter.MongoGetter import MongoGetter
+from .DataGetter.ParquetGetter import ParquetGetter
+from .DataGetter.RedisLookup import RedisLookup
 
 from .DataWriter.CSVWriter import CSVWriter
 from .DataWriter.ESWriter import ESWriter
@@ -21,6 +23,7 @@ from .DataWriter.XLSXWriter import XLSXWriter
 from .DataWriter.RedisWriter import RedisWriter
 from .DataWriter.MySQLWriter import MySQLWriter
 from .DataWriter.MongoWriter import MongoWriter
+from .DataWriter.ParquetWriter import ParquetWriter
 
 
 class ProcessFactory(object):
@@ -33,7 +36,8 @@ class ProcessFactory(object):
         GetterConfig.RAPIBulkConfig: APIBulkGetter,
         GetterConfig.RRedisConfig: RedisGetter,
         GetterConfig.RMySQLConfig: MySQLGetter,
-        GetterConfig.RMongoConfig: MongoGetter
+        GetterConfig.RMongoConfig: MongoGetter,
+        GetterConfig.RParquetConfig: ParquetGetter
     }
 
     config_writer_map = {
@@ -44,7 +48,8 @@ class ProcessFactory(object):
         WriterConfig.WXLSXConfig: XLSXWriter,
         WriterConfig.WRedisConfig: RedisWriter,
         WriterConfig.WMySQLConfig: MySQLWriter,
-        WriterConfig.WMongoConfig: MongoWriter
+        WriterConfig.WMongoConfig: MongoWriter,
+        WriterConfig.WParquetConfig: ParquetWriter
     }
 
     @staticmethod
@@ -57,7 +62,8 @@ class ProcessFactory(object):
             if isinstance(config, config_class):
                 return getter_class(config)
         raise ValueError("create_getter must pass one of the instance of [RAPIConfig, RCSVConfig, RESConfig, "
-                         "RJsonConfig, RXLSXConfig, RAPIBulkConfig, RRedisConfig, RMySQLConfig, RMongoConfig]")
+                         "RJsonConfig, RXLSXConfig, RAPIBulkConfig, RRedisConfig, RMySQLConfig, RMongoConfig, "
+                         "RParquetConfig]")
 
     @staticmethod
     def create_writer(config):
@@ -70,4 +76,15 @@ class ProcessFactory(object):
                 return writer_class(config)
         else:
             raise ValueError("create_writer must pass one of the instance of [WCSVConfig, WESConfig, WJsonConfig, "
-                             "WTXTConfig, WXLSXConfig, WRedisConfig, WMySQLConfig, WMongoConfig]")
+                             "WTXTConfig, WXLSXConfig, WRedisConfig, WMySQLConfig, WMongoConfig, "
+                             "WParquetConfig]")
+
+    @staticmethod
+    def create_lookup(config, key_func, **kwargs):
+        """
+        create a lookup to enrich items with records in redis HASH, see RedisLookup for kwargs
+        :return: lookup
+        """
+        if isinstance(config, GetterConfig.RRedisConfig):
+            return RedisLookup(config, key_func, **kwargs)
+        raise ValueError("create_lookup must pass an instance of RRedisConfig")
@@ -2,19 +2,20 @@ import json
 import asyncio
 import argparse
 from .DataProcess.Config.DefaultValue import DefaultVal
+from .DataProcess.Config.RedisConfig import close_redis_pools
 from .DataProcess.Config.ConfigUtil import GetterConfig
 from .DataProcess.Config.ConfigUtil import WriterConfig
 from .DataProcess.ProcessFactory import ProcessFactory
 
 
 class Args(object):
-    from_choices = ["API", "ES", "CSV", "XLSX", "JSON", "REDIS", "MYSQL", "MONGO"]
+    from_choices = ["API", "ES", "CSV", "XLSX", "JSON", "REDIS", "MYSQL", "MONGO", "PARQUET"]
     from_desc = "argument 'from' can only set to one of 'API', 'ES', 'CSV', 'XLSX', " \
-                "'JSON'(means json line by line file), 'REDIS', 'MYSQL' or 'MONGO'"
+                "'JSON'(means json line by line file), 'REDIS', 'MYSQL', 'MONGO' or 'PARQUET'"
 
-    to_choices = ["csv", "xlsx", "json", "txt", "es", "redis", 'mysql', 'mongo']
+    to_choices = ["csv", "xlsx", "json", "txt", "es", "redis", 'mysql', 'mongo', 'parquet']
     to_desc = "argument 'to' can only set to one of \"csv\", \"xlsx\", \"json\", \"txt\" \"es\", \"json\", \"redis\", " \
-              "\"mysql\", \"mongo\", \"json\" will write 'json.dumps(item)' line by line. " \
+              "\"mysql\", \"mongo\", \"parquet\", \"json\" will write 'json.dumps(item)' line by line. " \
               "\"txt\" will write each item line by line, each element in each line is separated by 'space' bu default"
 
     source_desc = """
@@ -68,7 +69,7 @@ class Args(object):
     """
 
     write_mode_desc = """'w' or 'a+'"""
-    key_type_desc = """redis data type to operate, options: [LIST] or [HASH], default: [LIST]"""
+    key_type_desc = """redis data type to operate, options: [LIST], [HASH] or [STREAM], default: [LIST]"""
 
 
 getter_config_map = {
@@ -79,7 +80,8 @@ getter_config_map = {
     Args.from_choices[4]: GetterConfig.RJsonConfig,
     Args.from_choices[5]: GetterConfig.RRedisConfig,
     Args.from_choices[6]: GetterConfig.RMySQLConfig,
-    Args.from_choices[7]: GetterConfig.RMongoConfig
+    Args.from_choices[7]: GetterConfig.RMongoConfig,
+    Args.from_choices[8]: GetterConfig.RParquetConfig
 }
 
 writer_config_map = {
@@ -90,7 +92,8 @@ writer_config_map = {
     Args.to_choices[4]: WriterConfig.WESConfig,
     Args.to_choices[5]: WriterConfig.WRedisConfig,
     Args.to_choices[6]: WriterConfig.WMySQLConfig,
-    Args.to_choices[7]: WriterConfig.WMongoConfig
+    Args.to_choices[7]: WriterConfig.WMongoConfig,
+    Args.to_choices[8]: WriterConfig.WParquetConfig
 }
 
 
@@ -128,12 +131,15 @@ def get_filter(filter_file):
 
 
 async def getter_to_writer(getter, writer):
-    with writer as safe_writer:
-        async for items in getter:
-            if asyncio.iscoroutinefunction(safe_writer.write):
-                await safe_writer.write(items)
-            else:
-                safe_writer.write(items)
+    try:
+        with writer as safe_writer:
+            async for items in getter:
+                if asyncio.iscoroutinefunction(safe_writer.write):
+                    await safe_writer.write(items)
+                else:
+                    safe_writer.write(items)
+    finally:
+        await close_redis_pools()
 
 
 def main():
@@ -178,7 +184,7 @@ def main():
         indices, doc_type = args.dest.split(":")
         to_args.append(indices)
         to_args.append(doc_type)
-    elif args.to in Args.to_choices[5:]:
+    elif args.to in Args.to_choices[5:8]:
         # redis, mysql, mongo
         if args.dest == DefaultVal.dest:
             to_args.append(DefaultVal.dest_without_path)